@@ -0,0 +1,98 @@
+"""
+Замер сжатия HTML-страниц ленты middleware CompressionMiddleware.
+
+Страницы рендерятся на тестовой базе с постами, затем каждая
+сжимается доступными кодированиями; выводятся размер до и после
+и процессорное время на один ответ:
+
+    python benchmarks/compression.py --posts 30 --repeat 200
+"""
+import argparse
+import time
+
+from common import setup_test_database
+
+PAGES = ('/', '/group/bench/', '/profile/bench/')
+
+
+def fill(posts):
+    from django.contrib.auth import get_user_model
+    from posts.models import Group, Post
+
+    author = get_user_model().objects.create_user(username='bench')
+    group = Group.objects.create(
+        title='Замеры', slug='bench', description='Группа для замеров'
+    )
+    Post.objects.bulk_create(
+        Post(
+            author=author,
+            group=group,
+            text=f'Пост номер {number}. ' + 'Съешь же ещё этих мягких '
+            'французских булок, да выпей чаю. ' * (number % 7 + 1),
+        )
+        for number in range(posts)
+    )
+
+
+def render(path):
+    from django.test import Client
+    return Client().get(path).content
+
+
+def cpu_per_call(func, repeat):
+    started = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--posts', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--chunk', type=int, default=4096)
+    args = parser.parse_args()
+
+    teardown = setup_test_database()
+    try:
+        from core import middleware
+
+        fill(args.posts)
+        encodings = ['gzip'] + (['br'] if middleware.brotli else [])
+        if not middleware.brotli:
+            print('brotli не установлен, замеряется только gzip')
+        for path in PAGES:
+            content = render(path)
+            print(f'{path}: {len(content)} байт')
+            chunks = [
+                content[start:start + args.chunk]
+                for start in range(0, len(content), args.chunk)
+            ]
+            for encoding in encodings:
+                size = len(middleware.compress(content, encoding))
+                whole = cpu_per_call(
+                    lambda: middleware.compress(content, encoding),
+                    args.repeat,
+                )
+                streamed = b''.join(
+                    middleware.compress_stream(chunks, encoding)
+                )
+                stream = cpu_per_call(
+                    lambda: b''.join(
+                        middleware.compress_stream(chunks, encoding)
+                    ),
+                    args.repeat,
+                )
+                print(
+                    f'  {encoding:5} {size:7} байт '
+                    f'(-{100 - size * 100 / len(content):.0f}%) '
+                    f'{whole * 1000:6.2f} мс CPU; '
+                    f'поток по {args.chunk}: {len(streamed):7} байт '
+                    f'{stream * 1000:6.2f} мс CPU'
+                )
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
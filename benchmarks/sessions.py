@@ -0,0 +1,87 @@
+"""
+Накладные расходы сессий на запрос авторизованного пользователя.
+
+Для каждой пары движка сессий и middleware авторизации запрос
+проходит через SessionMiddleware и middleware с обращением
+к request.user; выводится время и число запросов к базе на запрос:
+
+    python benchmarks/sessions.py --requests 2000
+"""
+import argparse
+import time
+
+from common import setup_test_database
+
+STOCK_AUTH = 'django.contrib.auth.middleware.AuthenticationMiddleware'
+SETUPS = (
+    ('django.contrib.sessions.backends.db', STOCK_AUTH),
+    ('core.sessions', STOCK_AUTH),
+    ('core.sessions', 'core.middleware.CachedAuthenticationMiddleware'),
+)
+
+
+def measure(engine, auth_path, session_key, requests, touch):
+    from django.contrib.sessions.middleware import SessionMiddleware
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from django.test.utils import CaptureQueriesContext
+    from django.utils.module_loading import import_string
+
+    def view(request):
+        request.user.is_authenticated
+        if touch:
+            request.session['last_page'] = '/'
+        return HttpResponse()
+
+    with override_settings(SESSION_ENGINE=engine):
+        handler = SessionMiddleware(import_string(auth_path)(view))
+        factory = RequestFactory()
+        factory.cookies['sessionid'] = session_key
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                handler(factory.get('/'))
+            elapsed = time.perf_counter() - started
+    return elapsed / requests, len(queries) / requests
+
+
+def login(engine, user):
+    from django.contrib.auth import login
+    from django.test import RequestFactory, override_settings
+    from django.utils.module_loading import import_module
+
+    with override_settings(SESSION_ENGINE=engine):
+        request = RequestFactory().get('/')
+        request.session = import_module(engine).SessionStore()
+        login(request, user)
+        request.session['last_page'] = '/'
+        request.session.save()
+    return request.session.session_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    teardown = setup_test_database()
+    try:
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_user(username='bench')
+        for engine, auth_path in SETUPS:
+            session_key = login(engine, user)
+            print(f'{engine} + {auth_path.rsplit(".", 1)[1]}')
+            for touch in (False, True):
+                seconds, queries = measure(
+                    engine, auth_path, session_key, args.requests, touch
+                )
+                kind = 'запись' if touch else 'чтение'
+                print(f'  {kind:7} {seconds * 1e6:8.1f} мкс '
+                      f'{queries:5.2f} запросов к базе')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Нагрузка на базу при истечении кэша главной страницы.
+
+Несколько потоков непрерывно запрашивают главную, пока ее запись
+в кэше несколько раз истекает. Для обычного кэша (get, при промахе
+пересчет и set) и для core.swr выводится число запросов к базе
+по интервалам времени и число перерисовок страницы:
+
+    python benchmarks/stampede.py --threads 16 --seconds 6
+"""
+import argparse
+import contextlib
+import threading
+import time
+from collections import Counter
+
+from common import setup_test_database
+
+
+def naive_get_or_set(key, compute, timeout, stale=None):
+    """Обычный кэш: каждый промах пересчитывает значение сам."""
+    from django.core.cache import cache
+
+    entry = cache.get(key)
+    if entry is None:
+        value = compute()
+        entry = (value, time.time() + timeout, 0)
+        if value is not None:
+            cache.set(key, entry, timeout)
+    return entry[0]
+
+
+def run(threads, seconds, bucket):
+    from django.db import connection
+    from django.test import Client
+    from django.test.signals import template_rendered
+
+    queries = Counter()
+    renders = Counter()
+    lock = threading.Lock()
+    started = time.monotonic()
+
+    def moment():
+        return int((time.monotonic() - started) / bucket)
+
+    def count_query(execute, sql, params, many, context):
+        with lock:
+            queries[moment()] += 1
+        return execute(sql, params, many, context)
+
+    def count_render(sender, template, **kwargs):
+        if template.name == 'posts/index.html':
+            with lock:
+                renders[moment()] += 1
+
+    def worker():
+        client = Client()
+        with connection.execute_wrapper(count_query):
+            while time.monotonic() - started < seconds:
+                client.get('/')
+        connection.close()
+
+    template_rendered.connect(count_render)
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    template_rendered.disconnect(count_render)
+    return queries, renders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=6)
+    parser.add_argument('--timeout', type=int, default=1)
+    parser.add_argument('--bucket', type=float, default=0.5)
+    parser.add_argument('--posts', type=int, default=200)
+    args = parser.parse_args()
+
+    teardown = setup_test_database()
+    try:
+        from unittest import mock
+
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from django.test import override_settings
+        from posts.models import Post
+
+        author = get_user_model().objects.create_user(username='bench')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for number in range(args.posts)
+        )
+        modes = (
+            ('обычный кэш', naive_get_or_set),
+            ('core.swr', None),
+        )
+        for name, replacement in modes:
+            cache.clear()
+            patch = (
+                mock.patch('core.pagecache.get_or_set', replacement)
+                if replacement else contextlib.nullcontext()
+            )
+            with patch, override_settings(PAGE_CACHE_TIMEOUT=args.timeout):
+                queries, renders = run(
+                    args.threads, args.seconds, args.bucket
+                )
+            print(name)
+            for index in range(int(args.seconds / args.bucket)):
+                print(f'  {index * args.bucket:5.1f} с '
+                      f'{queries[index]:6} запросов '
+                      f'{renders[index]:4} перерисовок')
+            print(f'  пик {max(queries.values())} запросов за интервал, '
+                  f'всего {sum(renders.values())} перерисовок')
+    finally:
+        teardown()
+
+
+if __name__ == '__main__':
+    main()
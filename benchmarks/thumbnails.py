@@ -0,0 +1,117 @@
+"""
+Сравнение движков миниатюр sorl-thumbnail на большом JPEG.
+
+Каждый движок запускается в отдельном процессе, чтобы пиковая
+память (ru_maxrss) не смешивалась между замерами:
+
+    python benchmarks/thumbnails.py --size 6000x4000 --geometry 960x339
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from io import BytesIO
+
+from common import ROOT, setup_django
+
+ENGINES = (
+    'sorl.thumbnail.engines.pil_engine.Engine',
+    'core.thumbnails.Engine',
+)
+
+
+def make_jpeg(size):
+    from PIL import Image
+    image = Image.merge('RGB', (
+        Image.linear_gradient('L').resize(size),
+        Image.effect_noise(size, 64),
+        Image.radial_gradient('L').resize(size),
+    ))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run_engine(path, data, geometry_string, repeat):
+    from django.utils.module_loading import import_string
+    from PIL import Image
+    from sorl.thumbnail.parsers import parse_geometry
+
+    engine = import_string(path)()
+    geometry = parse_geometry(geometry_string)
+    options = {
+        'crop': 'center', 'upscale': True, 'cropbox': None,
+        'colorspace': 'RGB', 'format': 'JPEG', 'quality': 95,
+        'rounded': None, 'padding': False, 'padding_color': '#ffffff',
+    }
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for _ in range(repeat):
+        image = Image.open(BytesIO(data))
+        thumbnail = engine.create(image, geometry, dict(options))
+        thumbnail.save(BytesIO(), 'JPEG', quality=options['quality'])
+    elapsed = (time.perf_counter() - started) / repeat
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {'seconds': elapsed, 'baseline_kb': baseline, 'peak_kb': peak}
+
+
+def child(args):
+    setup_django()
+    with open(args.source, 'rb') as source:
+        data = source.read()
+    result = run_engine(args.engine, data, args.geometry, args.repeat)
+    json.dump(result, sys.stdout)
+
+
+def parse_size(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', type=parse_size, default=(6000, 4000))
+    parser.add_argument('--geometry', default='960x339')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--engine', help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--make-source', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.engine:
+        return child(args)
+    if args.make_source:
+        with open(args.make_source, 'wb') as out:
+            out.write(make_jpeg(args.size))
+        return
+
+    # Исходник тоже готовится в отдельном процессе: ru_maxrss
+    # наследуется дочерними процессами и исказил бы замеры.
+    source = os.path.join(ROOT, 'benchmark-source.jpg')
+    subprocess.run(
+        [sys.executable, __file__, '--make-source', source,
+         '--size', f'{args.size[0]}x{args.size[1]}'],
+        check=True,
+    )
+    try:
+        print(f'source {args.size[0]}x{args.size[1]}, '
+              f'thumbnail {args.geometry}, {args.repeat} runs')
+        for path in ENGINES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--engine', path,
+                 '--source', source, '--geometry', args.geometry,
+                 '--repeat', str(args.repeat)],
+                check=True, stdout=subprocess.PIPE, text=True,
+            ).stdout
+            result = json.loads(output)
+            print(f'{path:45} {result["seconds"] * 1000:8.1f} ms '
+                  f'{result["peak_kb"] / 1024:8.1f} MiB peak '
+                  f'({result["baseline_kb"] / 1024:.1f} MiB before)')
+    finally:
+        os.remove(source)
+
+
+if __name__ == '__main__':
+    main()
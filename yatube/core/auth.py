@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.db import router
+from django.utils.crypto import constant_time_compare
+
+from .cache import shared_cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+# Поля пользователя, которые читают шаблоны и middleware.
+# Остальные, включая пароль, в кэш не попадают и догружаются
+# из базы только при обращении.
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def snapshot_fields():
+    """SNAPSHOT_FIELDS в порядке полей модели, как ждет from_db."""
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    ]
+
+
+def snapshot(user):
+    """Хеш сессии и значения полей из SNAPSHOT_FIELDS."""
+    return (
+        user.get_session_auth_hash(),
+        tuple(getattr(user, name) for name in snapshot_fields()),
+    )
+
+
+def restore(values):
+    names = snapshot_fields()
+    if len(values) != len(names):
+        return None
+    User = get_user_model()
+    return User.from_db(router.db_for_read(User), names, values)
+
+
+def cached_user(request):
+    """
+    Пользователь запроса из общего кэша по id из сессии. Кэш общий
+    для процессов, поэтому снимок, сброшенный в одном процессе после
+    смены пароля или блокировки, не читается и в остальных.
+    Снимок в кэше хранит хеш сессии, посчитанный по паролю, поэтому
+    после смены пароля старые сессии не пройдут проверку; сам пароль
+    в кэш не попадает. При промахе
+    или несовпадении пользователь загружается штатным get_user,
+    который сам сбрасывает сессию с неверным хешем.
+    """
+    session = request.session
+    backend_path = session.get(auth.BACKEND_SESSION_KEY)
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    try:
+        user_id = auth._get_user_session_key(request)
+    except KeyError:
+        user_id = None
+    if (
+        user_id is not None
+        and session_hash
+        and backend_path in settings.AUTHENTICATION_BACKENDS
+    ):
+        cached = shared_cache().get(user_cache_key(user_id))
+        if cached is not None and constant_time_compare(
+            session_hash, cached[0]
+        ):
+            user = restore(cached[1])
+            # Как ModelBackend.get_user: неактивный пользователь
+            # проверяется штатным путем.
+            if user is not None and user.is_active:
+                return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        shared_cache().set(
+            user_cache_key(user.pk),
+            snapshot(user),
+            settings.AUTH_USER_CACHE_TIMEOUT,
+        )
+    return user
+
+
+def forget_user(user_id):
+    shared_cache().delete(user_cache_key(user_id))
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Error, Tags, register
+
+# Бэкенды, данные которых не видны другим процессам.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    """
+    Кэш, общий для всех процессов сайта. В нем лежит то, что
+    должен сразу увидеть каждый процесс: отметки удаленных сессий,
+    снимки пользователей, счетчики постов в лентах.
+    """
+    return caches[settings.SHARED_CACHE_ALIAS]
+
+
+def shared_cache_users():
+    """Настройки, которым нужен общий кэш."""
+    users = []
+    if settings.SESSION_ENGINE == 'core.sessions':
+        users.append("SESSION_ENGINE = 'core.sessions'")
+    if 'core.middleware.CachedAuthenticationMiddleware' in settings.MIDDLEWARE:
+        users.append('CachedAuthenticationMiddleware')
+    return users
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    users = shared_cache_users()
+    if not users:
+        return []
+    alias = settings.SHARED_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend is None:
+        return [Error(
+            f'Кэш {alias!r} из SHARED_CACHE_ALIAS не настроен в CACHES.',
+            id='core.E001',
+        )]
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [Error(
+            f'Кэш {alias!r} не общий для процессов: {backend}.',
+            hint=(
+                f'{", ".join(users)} требует кэш, который видят все '
+                'процессы: FileBasedCache на одном сервере, memcached '
+                'или redis на нескольких.'
+            ),
+            id='core.E002',
+        )]
+    return []
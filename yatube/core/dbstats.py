@@ -0,0 +1,89 @@
+from django.db import DatabaseError, connections, router
+
+
+_sqlite_indexes = {}
+
+
+def _sqlite_stats(cursor, table):
+    try:
+        cursor.execute(
+            'SELECT idx, stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+        )
+    except DatabaseError:
+        # ANALYZE еще ни разу не запускали.
+        return {}
+    return {
+        idx: [int(part) for part in stat.split()[:2] if part.isdigit()]
+        for idx, stat in cursor.fetchall()
+    }
+
+
+def _sqlite_rows(connection, cursor, table, column):
+    stats = _sqlite_stats(cursor, table)
+    if not stats:
+        return None
+    numbers = next(iter(stats.values()))
+    if column is None:
+        return numbers[0] if numbers else None
+    numbers = stats.get(_sqlite_index(connection, cursor, table, column))
+    return numbers[1] if numbers and len(numbers) > 1 else None
+
+
+def _sqlite_index(connection, cursor, table, column):
+    """Индекс, который начинается с column; схема меняется редко."""
+    key = (connection.alias, table)
+    if key not in _sqlite_indexes:
+        constraints = connection.introspection.get_constraints(cursor, table)
+        _sqlite_indexes[key] = {
+            constraint['columns'][0]: name
+            for name, constraint in constraints.items()
+            if constraint['index'] and constraint['columns']
+        }
+    return _sqlite_indexes[key].get(column)
+
+
+def _postgresql_rows(connection, cursor, table, column):
+    cursor.execute(
+        'SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table]
+    )
+    row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    rows = row[0]
+    if column is None:
+        return int(rows)
+    cursor.execute(
+        'SELECT n_distinct FROM pg_stats '
+        'WHERE tablename = %s AND attname = %s',
+        [table, column],
+    )
+    row = cursor.fetchone()
+    if row is None or not row[0]:
+        return None
+    distinct = row[0] if row[0] > 0 else -row[0] * rows
+    return int(rows / distinct) if distinct else None
+
+
+ESTIMATORS = {
+    'sqlite': _sqlite_rows,
+    'postgresql': _postgresql_rows,
+}
+
+
+def estimate_rows(model, field_name=None):
+    """
+    Оценка числа строк таблицы модели по статистике базы, без COUNT.
+    С field_name - среднее число строк на одно значение поля, то есть
+    оценка выборки filter(field=value). Возвращает None, если база
+    не ведет статистику или ее еще не собрали (ANALYZE).
+    """
+    using = router.db_for_read(model)
+    connection = connections[using]
+    estimator = ESTIMATORS.get(connection.vendor)
+    if estimator is None:
+        return None
+    column = (
+        model._meta.get_field(field_name).column if field_name else None
+    )
+    with connection.cursor() as cursor:
+        return estimator(connection, cursor, model._meta.db_table, column)
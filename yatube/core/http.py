@@ -0,0 +1,47 @@
+def accepts_encoding(request, encoding):
+    """
+    Проверяет, что клиент принимает кодирование encoding
+    по заголовку Accept-Encoding, с учетом q=0 и звездочки.
+    """
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    accepted = {}
+    for item in header.split(','):
+        token, _, params = item.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token.strip().lower()] = quality
+    quality = accepted.get(encoding, accepted.get('*', 0.0))
+    return quality > 0
+
+
+def parse_range(header, size):
+    """
+    Разбирает заголовок Range с одним диапазоном байт.
+    Возвращает (начало, конец) включительно, None если заголовок
+    не задан или не поддерживается, и False для диапазона
+    за пределами файла.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec:
+        return None
+    start, _, end = spec.partition('-')
+    try:
+        if not start:
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
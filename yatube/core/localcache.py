@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Кэш в памяти процесса: не больше max_size записей, лишние
+    вытесняются по давности использования (LRU), каждая запись
+    живет timeout секунд. Потокобезопасен.
+    """
+
+    def __init__(self, max_size=1000, timeout=60):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def prune(self):
+        """Удаляет истекшие записи, не дожидаясь обращения к ним."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                key for key, (_, expires) in self._data.items()
+                if expires <= now
+            ]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
@@ -0,0 +1,172 @@
+import base64
+import json
+import logging
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboxEmail
+from .tasks import task
+from .writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+def serialize(message):
+    attachments = []
+    for filename, content, mimetype in message.attachments:
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append(
+            [filename, base64.b64encode(content).decode(), mimetype]
+        )
+    return json.dumps({
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': attachments,
+    })
+
+
+def deserialize(data, connection=None):
+    data = json.loads(data)
+    message = EmailMultiAlternatives(
+        subject=data['subject'],
+        body=data['body'],
+        from_email=data['from_email'],
+        to=data['to'],
+        cc=data['cc'],
+        bcc=data['bcc'],
+        reply_to=data['reply_to'],
+        headers=data['headers'],
+        alternatives=[tuple(item) for item in data['alternatives']],
+        connection=connection,
+    )
+    for filename, content, mimetype in data['attachments']:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    Почтовый бэкенд, который только кладет письма в очередь.
+    Отправляет их задача deliver_outbox или команда send_outbox
+    через OUTBOX_EMAIL_BACKEND, поэтому время ответа не зависит
+    от почтового сервера.
+    """
+
+    def send_messages(self, email_messages):
+        rows = [
+            OutboxEmail(message=serialize(message))
+            for message in email_messages
+            if message.recipients()
+        ]
+        if rows:
+            run_write(lambda: OutboxEmail.objects.bulk_create(rows))
+            deliver_outbox.delay(dedup_key='deliver_outbox')
+        return len(rows)
+
+
+def retry_delay(attempts):
+    """Задержка перед следующей попыткой растет вдвое с каждой ошибкой."""
+    return timedelta(
+        seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def claim_outbox(batch_size, max_attempts, now):
+    """
+    Захватывает пачку писем, время которых подошло, одним условным
+    UPDATE и возвращает только захваченные. Параллельные отправители
+    (команда send_outbox, задачи deliver_outbox в пуле воркера)
+    не получат одно письмо дважды; захват истекает через
+    OUTBOX_LEASE секунд, если отправитель упал.
+    """
+    claimable = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    candidates = list(
+        OutboxEmail.objects
+        .filter(claimable, attempts__lt=max_attempts, send_after__lte=now)
+        .order_by('send_after', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not candidates:
+        return []
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+    OutboxEmail.objects.filter(claimable, pk__in=candidates).update(
+        locked_until=now + timedelta(seconds=settings.OUTBOX_LEASE),
+        locked_by=owner,
+    )
+    return list(
+        OutboxEmail.objects.filter(locked_by=owner)
+        .order_by('send_after', 'id')
+    )
+
+
+def release(row, now, error):
+    """Освобождает письмо и откладывает его с растущей задержкой."""
+    OutboxEmail.objects.filter(pk=row.pk).update(
+        attempts=F('attempts') + 1,
+        send_after=now + retry_delay(row.attempts + 1),
+        locked_until=None,
+        last_error=repr(error),
+    )
+
+
+def send_outbox(batch_size=None, max_attempts=None):
+    """
+    Отправляет одну пачку писем, время которых подошло.
+    Письма сначала захватываются (claim_outbox), затем отправляются
+    одним соединением настоящего бэкенда; отправленные удаляются,
+    при ошибке письмо освобождается и откладывается с растущей
+    задержкой. Если соединение не открылось, так же откладывается
+    вся пачка. Возвращает (отправлено, с ошибкой).
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    now = timezone.now()
+    batch = claim_outbox(batch_size, max_attempts, now)
+    if not batch:
+        return 0, 0
+    try:
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        connection.open()
+    except Exception as error:
+        logger.warning('Outbox connection failed: %s', error)
+        for row in batch:
+            release(row, now, error)
+        return 0, len(batch)
+    sent, failed = [], 0
+    try:
+        for row in batch:
+            try:
+                deserialize(row.message, connection).send()
+            except Exception as error:
+                failed += 1
+                logger.warning('Outbox email %s failed: %s', row.pk, error)
+                release(row, now, error)
+            else:
+                sent.append(row.pk)
+    finally:
+        connection.close()
+    OutboxEmail.objects.filter(pk__in=sent).delete()
+    return len(sent), failed
+
+
+@task(priority=10)
+def deliver_outbox():
+    """Отправляет очередь писем, пока в ней есть готовые."""
+    while any(send_outbox()):
+        pass
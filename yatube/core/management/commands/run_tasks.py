@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from core.models import TaskStat
+from core.tasks import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди в пуле потоков или процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int)
+        parser.add_argument(
+            '--processes',
+            action='store_true',
+            help='Выполнять задачи в процессах, а не в потоках.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выйти, когда готовые задачи закончатся.',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Показать накопленную статистику задач и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for stat in TaskStat.objects.order_by('name'):
+                self.report(
+                    stat.name, stat.runs, stat.failures, stat.total_seconds,
+                    stat.max_seconds,
+                )
+            return
+        worker = Worker(options['workers'], options['processes'])
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            pass
+        for name, (runs, failures, seconds) in sorted(worker.metrics.items()):
+            self.report(name, runs, failures, seconds)
+
+    def report(self, name, runs, failures, seconds, max_seconds=None):
+        line = (
+            f'{name}: выполнено {runs}, с ошибкой {failures}, '
+            f'в среднем {seconds / runs * 1000:.1f} мс'
+        )
+        if max_seconds is not None:
+            line += f', максимум {max_seconds * 1000:.1f} мс'
+        self.stdout.write(line)
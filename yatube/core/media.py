@@ -0,0 +1,116 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse, Http404, HttpResponse, StreamingHttpResponse
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from .http import parse_range
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeFileWrapper:
+    """Отдает кусок файла от start длиной length блоками."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.remaining <= 0:
+            raise StopIteration
+        data = self.file.read(min(CHUNK_SIZE, self.remaining))
+        if not data:
+            raise StopIteration
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _file_response(request, full_path, size, content_type, etag):
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range and if_range and if_range != etag:
+        byte_range = None
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if byte_range is None:
+        return FileResponse(open(full_path, 'rb'), content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        RangeFileWrapper(open(full_path, 'rb'), start, length),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return response
+
+
+def serve(request, path):
+    """
+    Отдает загруженные файлы и миниатюры из MEDIA_ROOT.
+    Передачу файла можно отдать фронтенд-серверу через
+    X-Accel-Redirect (MEDIA_ACCEL_REDIRECT) или X-Sendfile
+    (MEDIA_SENDFILE). Без них файл отдается через FileResponse,
+    которому WSGI-сервер может отдать sendfile, а запросы
+    с Range получают нужный кусок файла.
+    Миниатюры адресуются хэшем содержимого и кэшируются бессрочно.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        content_type, _ = mimetypes.guess_type(full_path)
+        content_type = content_type or 'application/octet-stream'
+        if settings.MEDIA_ACCEL_REDIRECT:
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_REDIRECT + quote(path)
+            )
+        elif settings.MEDIA_SENDFILE:
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+        else:
+            response = _file_response(
+                request, full_path, stat.st_size, content_type, etag
+            )
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if path.startswith(thumbnail_settings.THUMBNAIL_PREFIX):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    return response
@@ -0,0 +1,148 @@
+import gzip
+import zlib
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .auth import cached_user
+from .http import accepts_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+class GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def process(self, chunk):
+        return (
+            self._compressor.compress(chunk)
+            + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        )
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+
+    def process(self, chunk):
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(
+            content, quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+    return gzip.compress(
+        content, settings.COMPRESSION_GZIP_LEVEL, mtime=0
+    )
+
+
+def compress_stream(chunks, encoding):
+    """
+    Сжимает поток по мере чтения: каждый кусок сразу сбрасывается
+    из компрессора, поэтому клиент получает его без задержки,
+    а в памяти не копится весь ответ.
+    """
+    stream = BrotliStream() if encoding == 'br' else GzipStream()
+    for chunk in chunks:
+        data = stream.process(chunk)
+        if data:
+            yield data
+    yield stream.finish()
+
+
+def choose_encoding(request):
+    if brotli is not None and accepts_encoding(request, 'br'):
+        return 'br'
+    if accepts_encoding(request, 'gzip'):
+        return 'gzip'
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает текстовые ответы brotli, если он установлен и его
+    принимает клиент, иначе gzip. Не трогает маленькие ответы,
+    уже закодированные, частичные и картинки. Потоковые ответы
+    сжимаются по кускам, не собираясь в памяти целиком.
+    """
+
+    def process_response(self, request, response):
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+            del response['Content-Length']
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, response):
+        if response.status_code != 200:
+            return False
+        if response.has_header('Content-Encoding'):
+            return False
+        # Файлы с поддержкой Range отдаются как есть: сжатие
+        # сломало бы смещения в байтах.
+        if response.has_header('Accept-Ranges'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        if not response.get('Content-Type', '').startswith(
+            COMPRESSIBLE_TYPES
+        ):
+            return False
+        return response.streaming or (
+            len(response.content) >= settings.COMPRESSION_MIN_LENGTH
+        )
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    AuthenticationMiddleware, который берет request.user из кэша:
+    на попадании запрос к таблице пользователей не делается.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: cached_user(request))
@@ -0,0 +1,85 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEmail(models.Model):
+    """
+    Письмо в очереди на отправку.
+    message хранит письмо в JSON, send_after - время следующей
+    попытки, locked_until и locked_by - захват письма отправителем,
+    как у Task. Отправленные письма удаляются, письма, исчерпавшие
+    попытки, остаются с текстом последней ошибки.
+    """
+
+    message = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    send_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['attempts', 'send_after'], name='outbox_pending_idx'
+            ),
+        ]
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+
+    def __str__(self):
+        return f'Письмо {self.pk}'
+
+
+class Task(models.Model):
+    """
+    Отложенная задача для команды run_tasks.
+    name - путь к функции-задаче, payload - аргументы в JSON.
+    Задачу с dedup_key нельзя поставить второй раз, пока первая
+    ждет выполнения. Выполненные задачи удаляются, задачи, исчерпавшие
+    попытки, остаются с текстом последней ошибки.
+    """
+
+    name = models.CharField(max_length=200)
+    payload = models.TextField(default='{}')
+    priority = models.SmallIntegerField(default=0)
+    dedup_key = models.CharField(
+        max_length=200, null=True, blank=True, unique=True
+    )
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_after'], name='task_queue_idx'
+            ),
+        ]
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self):
+        return f'{self.name} ({self.pk})'
+
+
+class TaskStat(models.Model):
+    """Накопленная статистика выполнения задач одного вида."""
+
+    name = models.CharField(max_length=200, primary_key=True)
+    runs = models.PositiveIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    max_seconds = models.FloatField(default=0)
+
+    class Meta:
+        verbose_name = 'Статистика задач'
+        verbose_name_plural = 'Статистика задач'
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,156 @@
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+from django.utils.module_loading import import_string
+
+from .swr import get_or_set
+
+HOLE_RE = re.compile(r'<!--hole:([^>]*)-->(.*?)<!--/hole-->', re.DOTALL)
+PLACEHOLDER_RE = re.compile(r'<!--hole:([^>]*)-->')
+
+
+def _digest(value):
+    return hashlib.md5(value.encode()).hexdigest()
+
+
+def state_cache_key(user_id):
+    return f'pagecache:state:{user_id}'
+
+
+def user_state(request):
+    """
+    Компактное состояние пользователя, от которого зависят дыры:
+    имя и то, что добавляют функции из PAGE_CACHE_USER_STATE
+    (например, на кого он подписан). Хранится в кэше и сбрасывается
+    сигналами через forget_user_state. key меняется вместе с любым
+    полем состояния, по нему кэшируется HTML дыр.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return {'key': 'anonymous'}
+    state = cache.get(state_cache_key(user.pk))
+    if state is None:
+        state = {
+            'username': user.get_username(),
+            'full_name': user.get_full_name(),
+        }
+        for path in settings.PAGE_CACHE_USER_STATE:
+            state.update(import_string(path)(user))
+        state['key'] = f'{user.pk}:{_digest(repr(sorted(state.items())))}'
+        cache.set(
+            state_cache_key(user.pk), state, settings.PAGE_CACHE_STATE_TIMEOUT
+        )
+    return state
+
+
+def forget_user_state(user_id):
+    cache.delete(state_cache_key(user_id))
+
+
+def hole_token(template_name, args):
+    return f'{template_name}?{urlencode(sorted(args.items()))}'
+
+
+def render_hole(request, token):
+    """
+    HTML дыры для пользователя запроса. Шаблон дыры получает свои
+    аргументы и state; результат кэшируется по шаблону, аргументам
+    и ключу состояния, поэтому на попадании ничего не рендерится.
+    """
+    state = user_state(request)
+    key = f'pagecache:hole:{_digest(token)}:{state["key"]}'
+    html = cache.get(key)
+    if html is None:
+        template_name, _, query = token.partition('?')
+        context = dict(parse_qsl(query, keep_blank_values=True))
+        context['state'] = state
+        html = render_to_string(template_name, context, request=request)
+        if not request.META.get('CSRF_COOKIE_USED'):
+            cache.set(key, html, settings.PAGE_CACHE_STATE_TIMEOUT)
+    return html
+
+
+def punch(request, template_name, args):
+    """
+    Выводит дыру. Если страница пишется в общий кэш, дыра помечается,
+    чтобы в кэш вместо нее попал плейсхолдер.
+    """
+    token = hole_token(template_name, args)
+    html = render_hole(request, token)
+    if getattr(request, 'punch_holes', False):
+        return f'<!--hole:{token}-->{html}<!--/hole-->'
+    return html
+
+
+def page_cache_key(request, key_prefix):
+    url = _digest(request.build_absolute_uri())
+    return f'pagecache:page:{key_prefix}:{url}'
+
+
+def cache_page_with_holes(timeout=None, key_prefix=''):
+    """
+    Кэширует страницу целиком, одну на всех пользователей.
+    Все, что зависит от пользователя, выводится тегом {% hole %}:
+    в кэш страница попадает с плейсхолдерами, а после чтения из кэша
+    они заполняются HTML из кэша дыр по состоянию пользователя.
+    Поэтому авторизованные пользователи получают ту же страницу
+    из кэша, что и анонимы. Формы с csrf_token нельзя выводить ни
+    на такой странице, ни в ее дырах: дыры тоже кэшируются и общие
+    для пользователей с одинаковым состоянием, поэтому личный токен
+    достался бы другим. Страница или дыра, при рендеринге которой
+    был запрошен токен, в кэш не пишется. Истекшую страницу
+    перерисовывает один запрос, остальные получают прежнюю (core.swr).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            rendered = []
+
+            def render_page():
+                request.punch_holes = True
+                response = view(request, *args, **kwargs)
+                rendered.append(response)
+                if response.streaming:
+                    return None
+                if hasattr(response, 'render'):
+                    response.render()
+                content = response.content.decode(response.charset)
+                response.content = HOLE_RE.sub(r'\2', content)
+                if (
+                    response.status_code != 200
+                    or request.META.get('CSRF_COOKIE_USED')
+                ):
+                    return None
+                return (
+                    HOLE_RE.sub(r'<!--hole:\1-->', content),
+                    response['Content-Type'],
+                )
+
+            cached = get_or_set(
+                page_cache_key(request, key_prefix),
+                render_page,
+                settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout,
+            )
+            if rendered:
+                response = rendered[0]
+            else:
+                content, content_type = cached
+                response = HttpResponse(
+                    PLACEHOLDER_RE.sub(
+                        lambda match: render_hole(request, match[1]), content
+                    ),
+                    content_type=content_type,
+                )
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return wrapper
+    return decorator
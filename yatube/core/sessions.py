@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends import db
+from django.contrib.sessions.backends.base import CreateError, UpdateError
+from django.db import (
+    DatabaseError, IntegrityError, close_old_connections, router,
+    transaction,
+)
+from django.utils import timezone
+
+from .cache import shared_cache
+from .localcache import LocalCache
+from .writer import run_write
+
+logger = logging.getLogger(__name__)
+
+SWEEP_BATCH_SIZE = 500
+
+local_sessions = LocalCache(max_size=settings.SESSION_LOCAL_CACHE_SIZE)
+
+
+def deleted_cache_key(session_key):
+    return f'session_deleted:{session_key}'
+
+
+def mark_deleted(session_key):
+    """
+    Отмечает сессию удаленной для всех процессов. Отметка в общем
+    кэше живет дольше любой локальной копии сессии.
+    """
+    shared_cache().set(
+        deleted_cache_key(session_key), True,
+        settings.SESSION_LOCAL_CACHE_TIMEOUT,
+    )
+    local_sessions.delete(session_key)
+
+
+class Sweeper:
+    """
+    Фоновое удаление истекших сессий вместо clearsessions.
+    Раз в SESSION_SWEEP_INTERVAL секунд поток удаляет истекшие
+    строки небольшими пачками, чтобы не держать долгую блокировку
+    записи, и чистит локальный кэш.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='session-sweeper', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.SESSION_SWEEP_INTERVAL)
+            try:
+                SessionStore.clear_expired()
+            except DatabaseError:
+                logger.exception('Session sweep failed')
+            finally:
+                close_old_connections()
+            local_sessions.prune()
+
+
+sweeper = Sweeper()
+
+
+class SessionStore(db.SessionStore):
+    """
+    Сессии в базе с кэшем в памяти процесса.
+    Чтение идет из локального кэша, в базу - только при промахе.
+    Запись пропускается, если закодированные данные не изменились
+    и срок жизни не нужно заметно продлевать. Записи уходят
+    через очередь записи, истекшие сессии удаляет фоновый поток.
+    Кэш у каждого процесса свой, поэтому изменения из других
+    процессов видны не позже чем через SESSION_LOCAL_CACHE_TIMEOUT,
+    а удаление - сразу, через отметку в общем кэше.
+    """
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        sweeper.start()
+
+    def _remember(self, session_key, session_data, expire_date):
+        local_sessions.set(
+            session_key,
+            (session_data, expire_date),
+            settings.SESSION_LOCAL_CACHE_TIMEOUT,
+        )
+
+    def load(self):
+        cached = local_sessions.get(self.session_key)
+        if cached is not None:
+            session_data, expire_date = cached
+            if expire_date > timezone.now() and not shared_cache().get(
+                deleted_cache_key(self.session_key)
+            ):
+                return self.decode(session_data)
+            local_sessions.delete(self.session_key)
+        session = self._get_session_from_db()
+        if session is None:
+            return {}
+        self._remember(
+            session.session_key, session.session_data, session.expire_date
+        )
+        return self.decode(session.session_data)
+
+    def _unchanged(self, obj):
+        cached = local_sessions.get(obj.session_key)
+        if cached is None:
+            return False
+        session_data, expire_date = cached
+        # Продление срока пишется, только когда сессия прожила
+        # больше половины срока, укорачивание - всегда.
+        extension = obj.expire_date - expire_date
+        half_age = timedelta(seconds=self.get_expiry_age() / 2)
+        return (
+            session_data == obj.session_data
+            and timedelta(0) <= extension < half_age
+        )
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        obj = self.create_model_instance(data)
+        if not must_create and self._unchanged(obj):
+            return
+        run_write(lambda: self._write(obj, must_create))
+        self._remember(obj.session_key, obj.session_data, obj.expire_date)
+
+    def _write(self, obj, must_create):
+        using = router.db_for_write(self.model, instance=obj)
+        try:
+            with transaction.atomic(using=using):
+                obj.save(
+                    force_insert=must_create,
+                    force_update=not must_create,
+                    using=using,
+                )
+        except IntegrityError:
+            if must_create:
+                raise CreateError
+            raise
+        except DatabaseError:
+            if not must_create:
+                raise UpdateError
+            raise
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            session_key = self.session_key
+        if session_key is None:
+            return
+        mark_deleted(session_key)
+        run_write(
+            lambda: self.model.objects.filter(
+                session_key=session_key
+            ).delete()
+        )
+
+    @classmethod
+    def clear_expired(cls):
+        model = cls.get_model_class()
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now())
+                .values_list('session_key', flat=True)[:SWEEP_BATCH_SIZE]
+            )
+            if not keys:
+                return
+            run_write(
+                lambda: model.objects.filter(session_key__in=keys).delete()
+            )
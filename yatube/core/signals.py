@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import forget_user
+from .pagecache import forget_user_state
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.pk)
+    forget_user_state(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_logged_out_forget(sender, user, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
@@ -0,0 +1,111 @@
+import gzip
+import mimetypes
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.functional import cached_property
+
+from .http import accepts_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.txt', '.html', '.json', '.map', '.xml'
+)
+MIN_COMPRESS_SIZE = 256
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики с хэшами в именах файлов.
+    collectstatic кладет рядом с каждым хэшированным файлом
+    сжатые копии .gz и, если установлен brotli, .br.
+    Шаблонный тег static подставляет хэшированные имена из манифеста;
+    файлы, которых нет в манифесте, отдаются под исходным именем.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            self.compress(hashed_name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        compressors = [('.gz', lambda raw: gzip.compress(raw, 9))]
+        if brotli is not None:
+            compressors.append(('.br', brotli.compress))
+        for suffix, compress in compressors:
+            compressed = compress(data)
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
+
+    @cached_property
+    def hashed_names(self):
+        return set(self.hashed_files.values())
+
+    def is_hashed(self, name):
+        return name in self.hashed_names
+
+
+def serve(request, path):
+    """
+    Отдает собранную статику из STATIC_ROOT.
+    Выбирает предварительно сжатую копию, которую принимает клиент,
+    хэшированные файлы отдает с бессрочным кэшированием.
+    """
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    content_type, _ = mimetypes.guess_type(full_path)
+    encoding = None
+    for name, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if (
+            accepts_encoding(request, name)
+            and os.path.isfile(full_path + suffix)
+        ):
+            encoding = name
+            full_path += suffix
+            break
+    response = FileResponse(
+        open(full_path, 'rb'),
+        content_type=content_type or 'application/octet-stream',
+    )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    hashed = getattr(staticfiles_storage, 'is_hashed', None)
+    if hashed is not None and hashed(path):
+        response['Cache-Control'] = IMMUTABLE
+    else:
+        response['Cache-Control'] = 'public, max-age=300'
+    return response
@@ -0,0 +1,91 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+POLL_INTERVAL = 0.05
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def early_expired(expires, delta, beta=None):
+    """
+    Вероятностное раннее обновление (XFetch): чем ближе срок и чем
+    дольше считалось значение (delta), тем вероятнее, что запрос
+    обновит его заранее. Так истечение не приходится на всех сразу.
+    """
+    if beta is None:
+        beta = settings.CACHE_EARLY_REFRESH_BETA
+    jitter = -delta * beta * math.log(1 - random.random())
+    return time.time() + jitter >= expires
+
+
+def coalesce(key, compute, using=None):
+    """
+    Один пересчет ключа на все одновременные промахи: пересчитывает
+    тот, кто взял блокировку через cache.add, остальные ждут значение
+    в кэше. Если значение так и не появилось (пересчет упал или его
+    результат не кэшируется), ожидающий считает сам. using - псевдоним
+    кэша, в который compute кладет значение; по умолчанию default.
+    """
+    store = caches[using] if using else cache
+    lock = lock_key(key)
+    if store.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            return compute()
+        finally:
+            store.delete(lock)
+    deadline = time.monotonic() + settings.CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = store.get(key)
+        if value is not None:
+            return value
+        if store.get(lock) is None:
+            break
+    return compute()
+
+
+def refresh(key, compute, timeout, stale):
+    """
+    Считает значение и кладет в кэш запись (значение, мягкий срок,
+    время расчета). Запись живет еще stale секунд после мягкого
+    срока, чтобы ее можно было отдавать, пока идет пересчет.
+    None не кэшируется.
+    """
+    started = time.perf_counter()
+    value = compute()
+    entry = (value, time.time() + timeout, time.perf_counter() - started)
+    if value is not None:
+        cache.set(key, entry, timeout + stale)
+    return entry
+
+
+def get_or_set(key, compute, timeout, stale=None):
+    """
+    Значение из кэша со stale-while-revalidate. Просроченное (или
+    выбранное для раннего обновления) значение пересчитывает один
+    запрос, взявший блокировку, остальные получают старое. Холодные
+    промахи объединяются через coalesce.
+    """
+    if stale is None:
+        stale = settings.CACHE_STALE_TIMEOUT
+    entry = cache.get(key)
+    if entry is None:
+        return coalesce(
+            key, lambda: refresh(key, compute, timeout, stale)
+        )[0]
+    value, expires, delta = entry
+    if not early_expired(expires, delta):
+        return value
+    lock = lock_key(key)
+    if not cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        return value
+    try:
+        return refresh(key, compute, timeout, stale)[0]
+    finally:
+        cache.delete(lock)
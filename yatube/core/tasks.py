@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from concurrent.futures import (
+    ProcessPoolExecutor, ThreadPoolExecutor, as_completed,
+)
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task, TaskStat
+from .writer import run_write
+
+logger = logging.getLogger(__name__)
+
+
+def task(func=None, *, priority=0, max_attempts=3):
+    """
+    Регистрирует функцию как задачу и добавляет ей метод delay,
+    который ставит вызов в очередь:
+
+        @task(priority=5)
+        def warm(post_id):
+            ...
+
+        warm.delay(post.pk, dedup_key=f'warm:{post.pk}')
+
+    Аргументы задачи должны сериализоваться в JSON.
+    """
+    def register(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.task_options = {
+            'priority': priority, 'max_attempts': max_attempts
+        }
+        func.delay = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        return func
+
+    return register(func) if func is not None else register
+
+
+def enqueue(
+    func, *args, dedup_key=None, priority=None, countdown=0, **kwargs
+):
+    """
+    Ставит задачу в очередь. Если задача с тем же dedup_key еще
+    ждет выполнения, вторая не добавляется. Внутри транзакции
+    задача появится в очереди вместе с ее фиксацией.
+    """
+    options = func.task_options
+    row = Task(
+        name=func.task_name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        priority=options['priority'] if priority is None else priority,
+        max_attempts=options['max_attempts'],
+        dedup_key=dedup_key,
+        run_after=timezone.now() + timedelta(seconds=countdown),
+    )
+    run_write(
+        lambda: Task.objects.bulk_create([row], ignore_conflicts=True)
+    )
+
+
+def execute(name, payload):
+    """
+    Выполняет задачу в потоке или процессе пула.
+    Возвращает (текст ошибки или None, длительность в секундах).
+    """
+    started = time.perf_counter()
+    try:
+        func = import_string(name)
+        if not hasattr(func, 'task_name'):
+            raise ValueError(f'{name} не зарегистрирована как задача')
+        data = json.loads(payload)
+        func(*data['args'], **data['kwargs'])
+        error = None
+    except Exception as exc:
+        logger.exception('Task %s failed', name)
+        error = repr(exc)
+    finally:
+        close_old_connections()
+    return error, time.perf_counter() - started
+
+
+def _claimable(now):
+    return Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+
+
+def claim(worker, limit):
+    """
+    Забирает до limit готовых задач в порядке приоритета.
+    Каждая задача захватывается условным UPDATE, поэтому
+    несколько воркеров не выполнят одну задачу дважды; захват
+    истекает через TASKS_LEASE секунд, если воркер упал. Ключ
+    дедупликации освобождается при захвате: то, что поставят
+    во время выполнения, выполнится следующим заходом.
+    """
+    now = timezone.now()
+    candidates = (
+        Task.objects
+        .filter(_claimable(now), run_after__lte=now)
+        .filter(attempts__lt=F('max_attempts'))
+        .order_by('-priority', 'run_after', 'id')
+        .values_list('id', flat=True)[:limit]
+    )
+    lease = now + timedelta(seconds=settings.TASKS_LEASE)
+    claimed = [
+        pk for pk in list(candidates)
+        if Task.objects.filter(_claimable(now), pk=pk).update(
+            locked_until=lease,
+            locked_by=worker,
+            attempts=F('attempts') + 1,
+            dedup_key=None,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by(
+        '-priority', 'run_after', 'id'
+    ))
+
+
+def record(row, error, seconds):
+    """Удаляет выполненную задачу или откладывает упавшую."""
+    if error is None:
+        Task.objects.filter(pk=row.pk).delete()
+    elif row.attempts >= row.max_attempts:
+        Task.objects.filter(pk=row.pk).update(
+            locked_until=None, last_error=error
+        )
+    else:
+        delay = settings.TASKS_RETRY_DELAY * 2 ** (row.attempts - 1)
+        Task.objects.filter(pk=row.pk).update(
+            locked_until=None,
+            last_error=error,
+            run_after=timezone.now() + timedelta(seconds=delay),
+        )
+    TaskStat.objects.get_or_create(name=row.name)
+    TaskStat.objects.filter(name=row.name).update(
+        runs=F('runs') + 1,
+        failures=F('failures') + int(error is not None),
+        total_seconds=F('total_seconds') + seconds,
+        max_seconds=Greatest('max_seconds', seconds),
+    )
+
+
+class Worker:
+    """
+    Воркер очереди задач.
+    Главный поток забирает задачи и записывает результаты, сами
+    задачи выполняются в пуле потоков или процессов.
+    """
+
+    def __init__(self, workers=None, processes=False):
+        self.workers = workers or settings.TASKS_WORKERS
+        self.processes = processes
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.metrics = defaultdict(lambda: [0, 0, 0.0])
+
+    def run(self, once=False):
+        if self.processes:
+            # Дочерние процессы не должны делить соединение с базой.
+            connections.close_all()
+            pool = ProcessPoolExecutor(self.workers)
+        else:
+            pool = ThreadPoolExecutor(self.workers)
+        with pool:
+            while True:
+                done = self.run_batch(pool)
+                if done:
+                    continue
+                if once:
+                    break
+                close_old_connections()
+                time.sleep(settings.TASKS_POLL_INTERVAL)
+
+    def run_batch(self, pool):
+        rows = claim(self.name, self.workers * 2)
+        futures = {
+            pool.submit(execute, row.name, row.payload): row for row in rows
+        }
+        for future in as_completed(futures):
+            row = futures[future]
+            error, seconds = future.result()
+            record(row, error, seconds)
+            metrics = self.metrics[row.name]
+            metrics[0] += 1
+            metrics[1] += error is not None
+            metrics[2] += seconds
+        return len(rows)
@@ -0,0 +1,18 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..pagecache import punch
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **kwargs):
+    """
+    Часть страницы, зависящая от пользователя:
+    {% hole 'includes/header.html' view=request.resolver_match.view_name %}
+    Шаблон дыры рендерится отдельно и получает только свои аргументы
+    (строками), state и контекст запроса, поэтому аргументы должны
+    полностью описывать все, кроме пользователя.
+    """
+    return mark_safe(punch(context['request'], template_name, kwargs))
@@ -6,3 +6,27 @@ register = template.Library()
 @register.filter
 def addclass(field, css):
     return field.as_widget(attrs={'class': css})
+
+
+@register.filter
+def elided_page_range(page, on_each_side=2):
+    """
+    Номера страниц для навигации: первая, последняя и по on_each_side
+    соседей текущей, пропуск обозначен None. Длина не зависит
+    от числа страниц в ленте.
+    """
+    num_pages = page.paginator.num_pages
+    numbers = {1, num_pages} | set(range(
+        max(page.number - on_each_side, 1),
+        min(page.number + on_each_side, num_pages) + 1,
+    ))
+    previous = 0
+    pages = []
+    for number in sorted(numbers):
+        if number > previous + 2:
+            pages.append(None)
+        elif number == previous + 2:
+            pages.append(previous + 1)
+        pages.append(number)
+        previous = number
+    return pages
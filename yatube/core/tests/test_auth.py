@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..auth import SNAPSHOT_FIELDS, snapshot_fields, user_cache_key
+from ..cache import shared_cache
+from ..middleware import CachedAuthenticationMiddleware
+from ..sessions import local_sessions
+from .test_sessions import run_in_other_process
+
+User = get_user_model()
+
+
+class CachedUserTests(TestCase):
+    def setUp(self):
+        shared_cache().clear()
+        local_sessions.clear()
+        self.user = User.objects.create_user(
+            username='reader', password='secret', first_name='Читатель'
+        )
+        self.client = Client()
+        self.client.login(username='reader', password='secret')
+        self.seen = []
+
+        def view(request):
+            self.seen.append(request.user)
+            request.user.is_authenticated
+            return HttpResponse()
+
+        self.handler = SessionMiddleware(CachedAuthenticationMiddleware(view))
+
+    def request(self):
+        request = RequestFactory().get('/')
+        request.COOKIES['sessionid'] = self.client.cookies['sessionid'].value
+        self.handler(request)
+        return self.seen[-1]
+
+    def test_identity_without_queries(self):
+        """На попадании в кэш пользователь не читается из базы."""
+        self.assertEqual(self.request().pk, self.user.pk)
+        with self.assertNumQueries(0):
+            user = self.request()
+            self.assertEqual(user.first_name, 'Читатель')
+            self.assertTrue(user.is_authenticated)
+
+    def test_snapshot_is_compact(self):
+        """В кэше нет пароля и лишних полей пользователя."""
+        self.request()
+        session_hash, values = shared_cache().get(user_cache_key(self.user.pk))
+        self.assertNotIn(self.user.password, values)
+        self.assertEqual(len(values), len(SNAPSHOT_FIELDS))
+        self.assertEqual(session_hash, self.user.get_session_auth_hash())
+
+    def test_inactive_user_rejected(self):
+        """Неактивный пользователь из снимка не авторизуется."""
+        self.request()
+        session_hash, values = shared_cache().get(user_cache_key(self.user.pk))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        values = tuple(
+            False if name == 'is_active' else value
+            for name, value in zip(snapshot_fields(), values)
+        )
+        shared_cache().set(
+            user_cache_key(self.user.pk), (session_hash, values)
+        )
+        self.assertFalse(self.request().is_authenticated)
+
+    def test_save_refreshes_snapshot(self):
+        """После сохранения пользователя снимок перечитывается."""
+        self.request()
+        self.user.first_name = 'Писатель'
+        self.user.save()
+        self.assertIsNone(shared_cache().get(user_cache_key(self.user.pk)))
+        self.assertEqual(self.request().first_name, 'Писатель')
+
+    def test_password_change_logs_out(self):
+        """Смена пароля завершает старые сессии."""
+        self.request()
+        self.user.set_password('changed')
+        self.user.save()
+        self.assertFalse(self.request().is_authenticated)
+
+    def test_password_change_in_other_process(self):
+        """Смена пароля в другом процессе завершает сессии и здесь."""
+        self.request()
+        # Пароль меняется в общей базе, снимок сбрасывает сигнал
+        # того процесса, где пользователь сохранен.
+        self.user.set_password('changed')
+        User.objects.filter(pk=self.user.pk).update(
+            password=self.user.password
+        )
+        run_in_other_process(
+            f'from core.auth import forget_user; forget_user({self.user.pk})'
+        )
+        self.assertFalse(self.request().is_authenticated)
+
+    def test_logout_forgets_user(self):
+        """Выход удаляет снимок пользователя."""
+        self.request()
+        self.client.get(reverse('users:logout'))
+        self.assertIsNone(shared_cache().get(user_cache_key(self.user.pk)))
+
+    def test_is_authentication_middleware(self):
+        """Middleware остается подклассом штатного."""
+        self.assertTrue(issubclass(
+            CachedAuthenticationMiddleware, AuthenticationMiddleware
+        ))
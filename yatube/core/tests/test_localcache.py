@@ -0,0 +1,32 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..localcache import LocalCache
+
+
+class LocalCacheTests(SimpleTestCase):
+    def test_least_recently_used_evicted(self):
+        """Сверх max_size вытесняется давно не читанная запись."""
+        cache = LocalCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire(self):
+        """Записи живут timeout секунд."""
+        cache = LocalCache(timeout=10)
+        with mock.patch('core.localcache.time.monotonic', return_value=100):
+            cache.set('a', 1)
+            cache.set('b', 2, timeout=100)
+        with mock.patch('core.localcache.time.monotonic', return_value=150):
+            self.assertEqual(cache.get('a', 'нет'), 'нет')
+            self.assertEqual(cache.prune(), 0)
+            self.assertEqual(cache.get('b'), 2)
+        with mock.patch('core.localcache.time.monotonic', return_value=500):
+            self.assertEqual(cache.prune(), 1)
+        self.assertEqual(len(cache), 0)
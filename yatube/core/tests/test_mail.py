@@ -0,0 +1,113 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..mail import deserialize, send_outbox, serialize
+from ..models import OutboxEmail
+
+User = get_user_model()
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class UnreachableBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('SMTP не отвечает')
+
+
+class ConcurrentBackend(locmem.EmailBackend):
+    """Пока письмо отправляется, очередь разбирает второй отправитель."""
+
+    concurrent = []
+
+    def send_messages(self, email_messages):
+        if not self.concurrent:
+            self.concurrent.append(send_outbox())
+        return super().send_messages(email_messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class OutboxTests(TestCase):
+    def test_password_reset_only_enqueues(self):
+        """Сброс пароля кладет письмо в очередь, отправляет команда."""
+        User.objects.create_user(
+            username='reader', email='reader@example.com', password='secret'
+        )
+        Client().post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+        out = StringIO()
+        call_command('send_outbox', stdout=out)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+        self.assertFalse(OutboxEmail.objects.exists())
+        self.assertIn('Отправлено писем: 1', out.getvalue())
+
+    def test_serialize_round_trip(self):
+        """Письмо восстанавливается из очереди целиком."""
+        message = EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'],
+            cc=['cc@example.com'], headers={'X-Tag': 'reset'},
+        )
+        message.attach_alternative('<p>Текст</p>', 'text/html')
+        message.attach('a.bin', b'\x00\x01', 'application/octet-stream')
+        restored = deserialize(serialize(message))
+        self.assertEqual(restored.subject, 'Тема')
+        self.assertEqual(restored.cc, ['cc@example.com'])
+        self.assertEqual(restored.extra_headers, {'X-Tag': 'reset'})
+        self.assertEqual(restored.alternatives, message.alternatives)
+        self.assertEqual(restored.attachments, message.attachments)
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=f'{__name__}.ConcurrentBackend')
+    def test_claimed_email_sent_once(self):
+        """Захваченные письма не отправляет второй отправитель."""
+        ConcurrentBackend.concurrent.clear()
+        for number in range(3):
+            mail.send_mail('Тема', 'Текст', None, [f'{number}@example.com'])
+        self.assertEqual(send_outbox(), (3, 0))
+        self.assertEqual(ConcurrentBackend.concurrent, [(0, 0)])
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=f'{__name__}.FailingBackend')
+    def test_failed_email_retried_later(self):
+        """Неудачное письмо откладывается с растущей задержкой."""
+        mail.send_mail('Тема', 'Текст', None, ['to@example.com'])
+        with self.assertLogs('core.mail', 'WARNING'):
+            self.assertEqual(send_outbox(), (0, 1))
+        row = OutboxEmail.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.send_after, timezone.now())
+        self.assertIn('SMTP недоступен', row.last_error)
+        self.assertEqual(send_outbox(), (0, 0))
+        OutboxEmail.objects.update(send_after=timezone.now())
+        self.assertEqual(send_outbox(max_attempts=1), (0, 0))
+
+    @override_settings(OUTBOX_EMAIL_BACKEND=f'{__name__}.UnreachableBackend')
+    def test_connection_failure_releases_batch(self):
+        """Если соединение не открылось, пачка освобождается и ждет."""
+        for number in range(2):
+            mail.send_mail('Тема', 'Текст', None, [f'{number}@example.com'])
+        with self.assertLogs('core.mail', 'WARNING'):
+            self.assertEqual(send_outbox(), (0, 2))
+        for row in OutboxEmail.objects.all():
+            self.assertEqual(row.attempts, 1)
+            self.assertIsNone(row.locked_until)
+            self.assertGreater(row.send_after, timezone.now())
+            self.assertIn('SMTP не отвечает', row.last_error)
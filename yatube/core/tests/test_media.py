@@ -0,0 +1,83 @@
+import os
+import shutil
+import tempfile
+
+from django.test import Client, TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/image.jpg', 'cache/ab/cd/thumb.jpg'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_full_file_with_validators(self):
+        """Файл отдается целиком с ETag и Last-Modified."""
+        response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        cached = self.client.get(
+            '/media/posts/image.jpg', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_range_request(self):
+        """Запрос с Range получает нужный кусок файла."""
+        response = self.client.get(
+            '/media/posts/image.jpg', HTTP_RANGE='bytes=10-19'
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(
+            b''.join(response.streaming_content), CONTENT[10:20]
+        )
+
+        suffix = self.client.get(
+            '/media/posts/image.jpg', HTTP_RANGE='bytes=-4'
+        )
+        self.assertEqual(b''.join(suffix.streaming_content), CONTENT[-4:])
+
+        outside = self.client.get(
+            '/media/posts/image.jpg', HTTP_RANGE='bytes=5000-'
+        )
+        self.assertEqual(outside.status_code, 416)
+
+    def test_thumbnails_are_immutable(self):
+        """Миниатюры кэшируются бессрочно."""
+        response = self.client.get('/media/cache/ab/cd/thumb.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/')
+    def test_accel_redirect(self):
+        """Передача файла отдается nginx через X-Accel-Redirect."""
+        response = self.client.get('/media/posts/image.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/image.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_missing_file(self):
+        """Несуществующий файл и выход из MEDIA_ROOT дают 404."""
+        for path in ('/media/posts/missing.jpg', '/media/../manage.py'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
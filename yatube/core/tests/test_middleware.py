@@ -0,0 +1,87 @@
+import gzip
+import zlib
+from unittest import mock, skipIf
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase
+
+from .. import middleware
+from ..middleware import CompressionMiddleware
+
+HTML = b'<p>Lorem ipsum dolor sit amet</p>\n' * 100
+
+
+def respond(response, encoding='gzip, br'):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    def test_gzip(self):
+        """Без brotli HTML сжимается gzip."""
+        with mock.patch.object(middleware, 'brotli', None):
+            response = respond(HttpResponse(HTML))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), HTML)
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content))
+        )
+
+    @skipIf(middleware.brotli is None, 'brotli не установлен')
+    def test_brotli_preferred(self):
+        """Клиент, принимающий brotli, получает brotli."""
+        response = respond(HttpResponse(HTML))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(middleware.brotli.decompress(response.content), HTML)
+
+    def test_skipped_responses(self):
+        """Маленькие, закодированные, бинарные ответы не сжимаются."""
+        encoded = HttpResponse(HTML)
+        encoded['Content-Encoding'] = 'identity'
+        cases = (
+            HttpResponse(b'<p>short</p>'),
+            encoded,
+            HttpResponse(HTML, content_type='image/png'),
+            HttpResponse(HTML, status=404),
+        )
+        for response in cases:
+            with self.subTest(response=response):
+                content = response.content
+                self.assertEqual(respond(response).content, content)
+        plain = respond(HttpResponse(HTML), encoding='identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(plain['Vary'], 'Accept-Encoding')
+
+    def test_streaming_is_incremental(self):
+        """Потоковый ответ сжимается по кускам по мере чтения."""
+        produced = []
+
+        def chunks():
+            for number in range(3):
+                produced.append(number)
+                yield HTML
+
+        with mock.patch.object(middleware, 'brotli', None):
+            response = respond(StreamingHttpResponse(chunks()))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        stream = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        first = decompressor.decompress(next(stream))
+        self.assertEqual(produced, [0])
+        self.assertEqual(first, HTML)
+        rest = b''.join(decompressor.decompress(data) for data in stream)
+        self.assertEqual(first + rest, HTML * 3)
+
+    def test_etag_weakened(self):
+        """Сжатый ответ получает слабый ETag."""
+        response = HttpResponse(HTML)
+        response['ETag'] = '"abc"'
+        self.assertEqual(respond(response)['ETag'], 'W/"abc"')
+
+
+class CompressedPagesTests(TestCase):
+    def test_index_compressed(self):
+        """Главная отдается сжатой клиенту с Accept-Encoding."""
+        response = Client().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn(response['Content-Encoding'], ('gzip', 'br'))
@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post
+
+from ..pagecache import cache_page_with_holes
+
+User = get_user_model()
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', first_name='Анна', last_name='Каренина'
+        )
+        Post.objects.create(author=cls.author, text='Пост в кэше')
+
+    def setUp(self):
+        cache.clear()
+        self.anonymous = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_shared_page_personal_holes(self):
+        """Страница из общего кэша заполняется для каждого пользователя."""
+        url = reverse('posts:posts_index')
+        response = self.anonymous.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertNotContains(response, 'Новая запись')
+        for client, name in (
+            (self.author_client, 'Лев Толстой'),
+            (self.reader_client, 'Анна Каренина'),
+        ):
+            with self.subTest(name=name):
+                response = client.get(url)
+                self.assertContains(response, 'Пост в кэше')
+                self.assertContains(response, f'Пользователь: {name}')
+                self.assertContains(response, 'Избранные авторы')
+                self.assertNotContains(response, '<!--hole')
+        response = self.anonymous.get(url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Избранные авторы')
+
+    def test_hit_without_rendering(self):
+        """Повторный запрос пользователя отдается без рендеринга и запросов."""
+        url = reverse('posts:posts_index')
+        self.reader_client.get(url)
+        self.reader_client.get(url)
+        with self.assertNumQueries(0):
+            response = self.reader_client.get(url)
+        self.assertIsNone(response.context)
+        self.assertContains(response, 'Анна Каренина')
+
+    def test_holes_follow_user_state(self):
+        """Подписка и смена имени сразу видны в дырах."""
+        url = reverse('posts:profile', args=['author'])
+        self.assertContains(self.reader_client.get(url), 'Подписаться')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        self.assertNotContains(self.author_client.get(url), 'Подписаться')
+        self.reader.first_name = 'Кити'
+        self.reader.save()
+        response = self.reader_client.get(reverse('posts:posts_index'))
+        self.assertContains(response, 'Кити Каренина')
+
+    def test_page_with_csrf_token_not_cached(self):
+        """Страница с токеном CSRF не попадает в общий кэш."""
+        calls = []
+
+        @cache_page_with_holes(key_prefix='csrf')
+        def view(request):
+            calls.append(request)
+            return HttpResponse(get_token(request))
+
+        first = view(RequestFactory().get('/form/'))
+        second = view(RequestFactory().get('/form/'))
+        self.assertEqual(len(calls), 2)
+        self.assertNotEqual(first.content, second.content)
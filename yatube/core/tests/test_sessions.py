@@ -0,0 +1,143 @@
+import os
+import subprocess
+import sys
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+
+from ..cache import shared_cache
+from ..localcache import LocalCache
+from ..sessions import SessionStore, local_sessions
+
+User = get_user_model()
+
+
+def run_in_other_process(code):
+    """Выполняет код в отдельном процессе с настройками сайта."""
+    subprocess.run(
+        [sys.executable, '-c', f'import django; django.setup(); {code}'],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings'},
+        check=True,
+    )
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        shared_cache().clear()
+        local_sessions.clear()
+        self.store = SessionStore()
+        self.store['answer'] = 42
+        self.store.save()
+
+    def test_reads_from_local_cache(self):
+        """Сохраненная сессия читается без запроса к базе."""
+        store = SessionStore(self.store.session_key)
+        with self.assertNumQueries(0):
+            self.assertEqual(store['answer'], 42)
+
+    def test_cache_miss_reads_database(self):
+        """При промахе сессия читается из базы и кэшируется."""
+        local_sessions.clear()
+        key = self.store.session_key
+        with self.assertNumQueries(1):
+            self.assertEqual(SessionStore(key)['answer'], 42)
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(key)['answer'], 42)
+
+    def test_unchanged_data_not_written(self):
+        """Сессия с теми же данными не перезаписывается."""
+        store = SessionStore(self.store.session_key)
+        store['answer'] = 42
+        with self.assertNumQueries(0):
+            store.save()
+        store['answer'] = 43
+        store.save()
+        local_sessions.clear()
+        self.assertEqual(SessionStore(self.store.session_key)['answer'], 43)
+
+    def test_shorter_expiry_written(self):
+        """Укороченный срок жизни пишется в базу."""
+        store = SessionStore(self.store.session_key)
+        store.set_expiry(60)
+        store.save()
+        session = Session.objects.get(session_key=store.session_key)
+        self.assertLess(
+            session.expire_date, timezone.now() + timedelta(seconds=61)
+        )
+
+    def test_delete(self):
+        """Удаленная сессия пропадает из кэша и базы."""
+        key = self.store.session_key
+        self.store.delete()
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(dict(SessionStore(key).items()), {})
+
+    def test_delete_seen_by_other_process(self):
+        """Сессия, удаленная другим процессом, не читается из своего кэша."""
+        key = self.store.session_key
+        other_process = LocalCache()
+        with mock.patch('core.sessions.local_sessions', other_process):
+            SessionStore(key).delete()
+        self.assertIsNotNone(local_sessions.get(key))
+        self.assertEqual(dict(SessionStore(key).items()), {})
+
+    def test_delete_in_other_process(self):
+        """Удаление в другом процессе видно через общий кэш."""
+        key = self.store.session_key
+        # База общая, ее строку процесс удалил бы так же.
+        Session.objects.filter(session_key=key).delete()
+        run_in_other_process(
+            f'from core.sessions import mark_deleted; mark_deleted({key!r})'
+        )
+        self.assertIsNotNone(local_sessions.get(key))
+        self.assertEqual(dict(SessionStore(key).items()), {})
+
+    def test_clear_expired(self):
+        """Истекшие сессии удаляются, живые остаются."""
+        Session.objects.create(
+            session_key='expired',
+            session_data='',
+            expire_date=timezone.now() - timedelta(days=1),
+        )
+        SessionStore.clear_expired()
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            [self.store.session_key],
+        )
+
+
+class AuthenticatedRequestTests(TestCase):
+    def test_login_survives_requests(self):
+        """Вход работает и держится между запросами."""
+        User.objects.create_user(username='reader', password='secret')
+        client = Client()
+        self.assertTrue(client.login(username='reader', password='secret'))
+        response = client.get('/follow/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'].username, 'reader')
+
+
+class SharedCacheCheckTests(TestCase):
+    @override_settings(CACHES={
+        'default': settings.CACHES['default'],
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    })
+    def test_process_local_cache_refused(self):
+        """Сессии не запускаются с кэшем в памяти процесса."""
+        errors = run_checks(tags=['caches'])
+        self.assertEqual([error.id for error in errors], ['core.E002'])
+
+    def test_shared_cache_accepted(self):
+        """Настроенный общий кэш проходит проверку."""
+        self.assertEqual(run_checks(tags=['caches']), [])
@@ -0,0 +1,69 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import Client, TestCase, override_settings
+
+CSS = b'body { color: black; }\n' * 100
+
+
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.source, 'css'))
+        with open(os.path.join(cls.source, 'css', 'site.css'), 'wb') as css:
+            css.write(CSS)
+        cls.settings_override = override_settings(
+            STATICFILES_DIRS=[cls.source], STATIC_ROOT=cls.root
+        )
+        cls.settings_override.enable()
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def hashed_url(self):
+        return Template(
+            "{% load static %}{% static 'css/site.css' %}"
+        ).render(Context())
+
+    def test_static_tag_uses_hashed_name(self):
+        """Тег static подставляет имя файла с хэшем."""
+        url = self.hashed_url()
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.root, url[8:] + '.gz'))
+        )
+
+    def test_serves_precompressed_with_immutable_cache(self):
+        """Хэшированный файл отдается сжатым с бессрочным кэшем."""
+        response = Client().get(
+            self.hashed_url(), HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        body = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(body), CSS)
+
+    def test_serves_plain_file_without_accept_encoding(self):
+        """Без Accept-Encoding отдается исходный файл."""
+        response = Client().get('/static/css/site.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_missing_file(self):
+        """Пути за пределами STATIC_ROOT не отдаются."""
+        response = Client().get('/static/../settings.py')
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,98 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..pagecache import page_cache_key
+from ..swr import coalesce, early_expired, get_or_set, lock_key
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def compute(self, value='новое'):
+        def compute():
+            self.calls.append(value)
+            return value
+        return compute
+
+    def test_computed_once(self):
+        """Значение считается один раз и дальше берется из кэша."""
+        for _ in range(3):
+            self.assertEqual(get_or_set('key', self.compute(), 60), 'новое')
+        self.assertEqual(self.calls, ['новое'])
+
+    def test_stale_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдается старое значение."""
+        cache.set('key', ('старое', time.time() - 1, 0.01), 60)
+        cache.add(lock_key('key'), 1)
+        self.assertEqual(get_or_set('key', self.compute(), 60), 'старое')
+        self.assertEqual(self.calls, [])
+        cache.delete(lock_key('key'))
+        self.assertEqual(get_or_set('key', self.compute(), 60), 'новое')
+        self.assertIsNone(cache.get(lock_key('key')))
+        self.assertEqual(get_or_set('key', self.compute(), 60), 'новое')
+        self.assertEqual(self.calls, ['новое'])
+
+    def test_early_expiration(self):
+        """Раннее обновление тем вероятнее, чем ближе срок."""
+        now = time.time()
+        self.assertTrue(early_expired(now - 1, 0))
+        self.assertFalse(early_expired(now + 60, 0))
+        with mock.patch('core.swr.random.random', return_value=0.9):
+            self.assertFalse(early_expired(now + 60, 1))
+            self.assertTrue(early_expired(now + 2, 1))
+
+    def test_cold_misses_coalesced(self):
+        """Одновременные промахи считают значение один раз."""
+        def slow():
+            self.calls.append(1)
+            time.sleep(0.2)
+            return 'значение'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(get_or_set('key', slow, 60))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['значение'] * 5)
+        self.assertEqual(self.calls, [1])
+
+    def test_uncacheable_not_awaited(self):
+        """Если пересчет ничего не сохранил, ожидающий считает сам."""
+        cache.add(lock_key('key'), 1)
+        threading.Timer(0.1, cache.delete, [lock_key('key')]).start()
+        started = time.monotonic()
+        self.assertEqual(coalesce('key', self.compute()), 'новое')
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class StalePageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_expired_page_served_stale(self):
+        """Истекшая главная отдается старой, пока ее перерисовывают."""
+        client = Client()
+        url = reverse('posts:posts_index')
+        client.get(url)
+        key = page_cache_key(client.get(url).wsgi_request, 'index')
+        page, _, delta = cache.get(key)
+        cache.set(key, (page, time.time() - 1, delta), 60)
+        cache.add(lock_key(key), 1)
+        response = client.get(url)
+        self.assertIsNone(response.context)
+        cache.delete(lock_key(key))
+        response = client.get(url)
+        self.assertIsNotNone(response.context)
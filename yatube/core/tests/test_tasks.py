@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Post
+
+from ..models import Task, TaskStat
+from ..tasks import Worker, claim, task
+
+User = get_user_model()
+calls = []
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError('сломалось')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_deduplication(self):
+        """Задача с тем же ключом не ставится дважды."""
+        remember.delay(1, dedup_key='one')
+        remember.delay(2, dedup_key='one')
+        remember.delay(3)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_priority_and_claim(self):
+        """Задачи забираются по приоритету и только одним воркером."""
+        remember.delay('low')
+        remember.delay('high', priority=5)
+        remember.delay('later', countdown=60)
+        rows = claim('first', 10)
+        self.assertEqual(
+            [row.payload for row in rows],
+            ['{"args": ["high"], "kwargs": {}}',
+             '{"args": ["low"], "kwargs": {}}'],
+        )
+        self.assertEqual(claim('second', 10), [])
+
+    def test_worker_runs_tasks(self):
+        """Воркер выполняет задачи, удаляет их и копит статистику."""
+        for number in range(5):
+            remember.delay(number)
+        out = StringIO()
+        call_command('run_tasks', '--once', '--workers=2', stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(TaskStat.objects.get(name=remember.task_name).runs, 5)
+        self.assertIn(f'{remember.task_name}: выполнено 5', out.getvalue())
+
+    def test_failed_task_retried_then_kept(self):
+        """Упавшая задача откладывается, а после всех попыток остается."""
+        explode.delay()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            Worker(workers=1).run(once=True)
+        row = Task.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.run_after, timezone.now())
+        self.assertIn('сломалось', row.last_error)
+        Task.objects.update(run_after=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('core.tasks', 'ERROR'):
+            Worker(workers=1).run(once=True)
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 2)
+        self.assertEqual(claim('worker', 10), [])
+        stat = TaskStat.objects.get(name=explode.task_name)
+        self.assertEqual(stat.failures, 2)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class TaskUsageTests(TransactionTestCase):
+    """Задачи ходят в базу из потоков пула, поэтому без транзакции теста."""
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_post_image_warms_thumbnail(self):
+        """Новая картинка поста ставит задачу на миниатюру."""
+        author = User.objects.create_user(username='author')
+        gif = (
+            b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff'
+            b'!\xf9\x04\x00\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01'
+            b'\x00\x00\x02\x02D\x01\x00;'
+        )
+        post = Post.objects.create(
+            author=author,
+            text='Пост',
+            image=SimpleUploadedFile('a.gif', gif, content_type='image/gif'),
+        )
+        self.assertEqual(
+            Task.objects.get().dedup_key, f'warm_thumbnails:{post.pk}'
+        )
+        Worker(workers=1).run(once=True)
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.OutboxEmailBackend',
+        OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    )
+    def test_outbox_delivered_by_task(self):
+        """Письма из очереди отправляет задача."""
+        mail.send_mail('Тема', 'Текст', None, ['a@example.com'])
+        mail.send_mail('Тема', 'Текст', None, ['b@example.com'])
+        self.assertEqual(Task.objects.count(), 1)
+        Worker(workers=1).run(once=True)
+        self.assertEqual(len(mail.outbox), 2)
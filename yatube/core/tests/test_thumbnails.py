@@ -0,0 +1,80 @@
+from io import BytesIO
+
+from django.test import SimpleTestCase
+from PIL import Image
+from sorl.thumbnail.engines.pil_engine import Engine as PILEngine
+from sorl.thumbnail.parsers import parse_geometry
+
+from ..thumbnails import Engine
+
+ORIENTATION = 0x0112
+OPTIONS = {
+    'crop': 'center',
+    'upscale': True,
+    'cropbox': None,
+    'colorspace': 'RGB',
+    'format': 'JPEG',
+    'quality': 95,
+    'rounded': None,
+    'padding': False,
+    'padding_color': '#ffffff',
+}
+
+
+def open_image(size, image_format='JPEG', orientation=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (200, 100, 50))
+    exif = Image.Exif()
+    if orientation:
+        exif[ORIENTATION] = orientation
+    image.save(buffer, image_format, exif=exif)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+class EngineTests(SimpleTestCase):
+    def create(self, engine, image, geometry_string):
+        geometry = parse_geometry(geometry_string)
+        return engine.create(image, geometry, dict(OPTIONS))
+
+    def test_large_jpeg_is_decoded_reduced(self):
+        """Большой JPEG декодируется в уменьшенном масштабе."""
+        image = open_image((2400, 1600))
+        thumbnail = self.create(Engine(), image, '200x100')
+        self.assertEqual(thumbnail.size, (200, 100))
+        self.assertEqual(image.size, (300, 200))
+
+    def test_result_matches_stock_engine(self):
+        """Размер миниатюры не отличается от обычного движка."""
+        for size, geometry, orientation in (
+            ((2400, 1600), '960x339', None),
+            ((1600, 2400), '150x150', None),
+            ((2400, 1600), '100x300', 6),
+        ):
+            with self.subTest(size=size, geometry=geometry):
+                expected = self.create(
+                    PILEngine(), open_image(size, orientation=orientation),
+                    geometry,
+                )
+                thumbnail = self.create(
+                    Engine(), open_image(size, orientation=orientation),
+                    geometry,
+                )
+                self.assertEqual(thumbnail.size, expected.size)
+
+    def test_rotated_jpeg_keeps_enough_pixels(self):
+        """Поворот по EXIF учитывается при выборе масштаба."""
+        image = open_image((2400, 1600), orientation=6)
+        thumbnail = self.create(Engine(), image, '100x300')
+        self.assertEqual(thumbnail.size, (100, 300))
+        # После поворота ширина исходника станет высотой.
+        self.assertEqual(image.size, (300, 200))
+
+    def test_other_formats_are_not_drafted(self):
+        """PNG и небольшие уменьшения идут обычным путем."""
+        png = open_image((2400, 1600), image_format='PNG')
+        self.create(Engine(), png, '200x100')
+        self.assertEqual(png.size, (2400, 1600))
+        jpeg = open_image((400, 200))
+        self.create(Engine(), jpeg, '300x150')
+        self.assertEqual(jpeg.size, (400, 200))
@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+from ..writer import get_write_queue, run_write
+
+User = get_user_model()
+
+
+@override_settings(WRITE_QUEUE_ENABLED=True)
+class WriteQueueTests(TransactionTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def test_concurrent_writes_are_committed(self):
+        """Записи из разных потоков сохраняются через очередь."""
+        def write(number):
+            return run_write(lambda: Comment.objects.create(
+                author=self.author, post=self.post, text=str(number)
+            ))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            comments = list(pool.map(write, range(40)))
+
+        self.assertEqual(len({comment.pk for comment in comments}), 40)
+        self.assertEqual(Comment.objects.count(), 40)
+
+    def test_failed_write_does_not_break_batch(self):
+        """Ошибка одной записи возвращается только её отправителю."""
+        def broken():
+            raise ValueError('broken')
+
+        with self.assertRaises(ValueError):
+            run_write(broken)
+        run_write(lambda: Comment.objects.create(
+            author=self.author, post=self.post, text='ok'
+        ))
+        self.assertTrue(Comment.objects.filter(text='ok').exists())
+
+    @override_settings(WRITE_QUEUE_TIMEOUT=0.1)
+    def test_timed_out_write_cancelled(self):
+        """Запись, которую не дождались, не выполняется позже."""
+        started, release = threading.Event(), threading.Event()
+
+        def blocker():
+            started.set()
+            release.wait(5)
+
+        blocked = get_write_queue().submit(blocker)
+        started.wait(5)
+        with self.assertRaises(TimeoutError):
+            run_write(lambda: Comment.objects.create(
+                author=self.author, post=self.post, text='late'
+            ))
+        release.set()
+        blocked.result(timeout=5)
+        run_write(lambda: None)
+        self.assertFalse(Comment.objects.filter(text='late').exists())
+
+    def test_views_use_write_queue(self):
+        """Комментарий и подписка создаются через очередь записи."""
+        user = User.objects.create_user(username='user')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'Комментарий'},
+        )
+        client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertTrue(Comment.objects.filter(author=user).exists())
+        self.assertTrue(
+            Follow.objects.filter(user=user, author=self.author).exists()
+        )
@@ -0,0 +1,45 @@
+import math
+
+from sorl.thumbnail.engines import pil_engine
+
+# JPEG декодируется с уменьшением в 2, 4 или 8 раз,
+# меньшего уменьшения draft не дает.
+MIN_DRAFT_FACTOR = 0.5
+
+
+class Engine(pil_engine.Engine):
+    """
+    Движок sorl-thumbnail, который декодирует большие JPEG
+    сразу в уменьшенном масштабе. Декодер libjpeg умеет отдавать
+    картинку в 1/2, 1/4 или 1/8 размера, не разворачивая ее целиком,
+    поэтому время и память зависят от размера миниатюры, а не
+    оригинала. Остальные форматы обрабатываются как обычно.
+    """
+
+    def create(self, image, geometry, options):
+        self.draft(image, geometry, options)
+        return super().create(image, geometry, options)
+
+    def draft(self, image, geometry, options):
+        if image.format != 'JPEG' or image.im is not None:
+            return
+        if options.get('cropbox') or options.get('remove_border'):
+            return
+        x_image, y_image = image.size
+        # Размеры считаются после поворота по EXIF, который сделает create.
+        if self.flip_dimensions(image, geometry, options):
+            factor = self._calculate_scaling_factor(
+                y_image, x_image, geometry, options
+            )
+        else:
+            factor = self._calculate_scaling_factor(
+                x_image, y_image, geometry, options
+            )
+        if factor > MIN_DRAFT_FACTOR:
+            return
+        # draft берет наибольшее уменьшение, при котором картинка
+        # не меньше запрошенной, дальше ее доводит обычный resize.
+        image.draft(image.mode, (
+            math.ceil(x_image * factor),
+            math.ceil(y_image * factor),
+        ))
@@ -0,0 +1,118 @@
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+
+class _Job:
+    __slots__ = ('func', 'future')
+
+    def __init__(self, func):
+        self.func = func
+        self.future = Future()
+
+
+class WriteQueue:
+    """
+    Очередь записи для одной базы данных.
+    Все переданные функции выполняются в одном потоке-писателе,
+    который собирает накопившиеся задачи в пачку и выполняет их
+    в общей транзакции. Каждая задача оборачивается в savepoint,
+    поэтому ошибка одной задачи не откатывает остальные.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=50):
+        self.using = using
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f'write-queue-{using}',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, func):
+        job = _Job(func)
+        self._queue.put(job)
+        return job.future
+
+    def _take_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                self._run_batch(batch)
+            finally:
+                connections[self.using].close_if_unusable_or_obsolete()
+
+    def _run_batch(self, batch):
+        done = []
+        try:
+            with transaction.atomic(using=self.using):
+                for job in batch:
+                    if not job.future.set_running_or_notify_cancel():
+                        # Отправитель перестал ждать и отменил запись.
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            result = job.func()
+                    except Exception as exc:
+                        job.future.set_exception(exc)
+                    else:
+                        done.append((job, result))
+        except Exception as exc:
+            for job, result in done:
+                job.future.set_exception(exc)
+            return
+        for job, result in done:
+            job.future.set_result(result)
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_write_queue(using=DEFAULT_DB_ALIAS):
+    with _queues_lock:
+        if using not in _queues:
+            _queues[using] = WriteQueue(
+                using, batch_size=settings.WRITE_QUEUE_BATCH_SIZE
+            )
+        return _queues[using]
+
+
+def run_write(func, using=DEFAULT_DB_ALIAS):
+    """
+    Выполняет небольшую запись в базу и возвращает её результат.
+    При включенной настройке WRITE_QUEUE_ENABLED запись уходит
+    в поток-писатель базы, а запрос ждет результат не дольше
+    WRITE_QUEUE_TIMEOUT секунд. Иначе, а также внутри открытой
+    транзакции, функция выполняется сразу: поток-писатель ждал бы
+    блокировку, которую держит эта же транзакция. Если время ожидания
+    вышло, а запись еще в очереди, она отменяется, чтобы ошибка
+    запроса не разошлась с содержимым базы; уже начатую запись
+    приходится дождаться.
+    """
+    if (
+        not settings.WRITE_QUEUE_ENABLED
+        or connections[using].in_atomic_block
+    ):
+        return func()
+    future = get_write_queue(using).submit(func)
+    try:
+        return future.result(timeout=settings.WRITE_QUEUE_TIMEOUT)
+    except TimeoutError:
+        if future.cancel():
+            raise
+        return future.result()
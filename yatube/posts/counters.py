@@ -0,0 +1,219 @@
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS, DatabaseError, close_old_connections, connections,
+    transaction,
+)
+from django.db.models import Count, F
+
+from core.cache import shared_cache
+from core.dbstats import estimate_rows
+from core.swr import coalesce
+from core.tasks import task
+
+from .models import Follow, Post, PostViewDelta
+
+
+class ViewCounter:
+    """
+    Счетчик просмотров постов.
+    Просмотры копятся в памяти процесса и раз в
+    POST_VIEWS_FLUSH_INTERVAL секунд сбрасываются в поле Post.views.
+    Сброс делается через UPDATE views = views + n, поэтому несколько
+    процессов не затирают счетчики друг друга. Посты с одинаковым
+    приростом обновляются одним запросом. Тот же прирост пишется
+    в PostViewDelta, откуда его забирает update_trending.
+    Поток сброса запускается первым просмотром и пишет только
+    в ту базу, которая была настроена в этот момент: после тестов
+    настройки возвращаются к рабочей базе, и просмотры тестовых
+    постов туда не попадают. При POST_VIEWS_FLUSH_INTERVAL = None
+    поток не запускается, просмотры сбрасываются только вызовом
+    flush().
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._database = None
+
+    @staticmethod
+    def _current_database():
+        return connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+    def hit(self, post_id):
+        with self._lock:
+            self._counts[post_id] += 1
+            if self._flusher is None:
+                self._start()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+        if (
+            self._database is not None
+            and self._database != self._current_database()
+        ):
+            # База, в которой считались просмотры, уже не настроена.
+            return
+        by_delta = defaultdict(list)
+        for post_id, delta in counts.items():
+            by_delta[delta].append(post_id)
+        try:
+            with transaction.atomic():
+                # Удаленные за это время посты пропускаются.
+                existing = Post.objects.filter(
+                    pk__in=list(counts)
+                ).values_list('pk', flat=True)
+                for delta, post_ids in by_delta.items():
+                    Post.objects.filter(pk__in=post_ids).update(
+                        views=F('views') + delta
+                    )
+                PostViewDelta.objects.bulk_create(
+                    PostViewDelta(post_id=post_id, views=counts[post_id])
+                    for post_id in existing
+                )
+        except DatabaseError:
+            with self._lock:
+                self._counts.update(counts)
+
+    def _start(self):
+        if settings.POST_VIEWS_FLUSH_INTERVAL is None:
+            self._flusher = False
+            return
+        self._database = self._current_database()
+        self._flusher = threading.Thread(
+            target=self._run, name='post-views-flusher', daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(settings.POST_VIEWS_FLUSH_INTERVAL)
+            self.flush()
+            close_old_connections()
+
+
+view_counter = ViewCounter()
+
+
+def feed_cache_key(feed):
+    return f'feed_count:{feed}'
+
+
+def post_feeds(author_id, group_id):
+    """Ленты, в которые попадает пост: 'index', 'author:1', 'group:2'."""
+    feeds = ['index', f'author:{author_id}']
+    if group_id:
+        feeds.append(f'group:{group_id}')
+    return feeds
+
+
+def feed_posts(feed):
+    kind, _, pk = feed.partition(':')
+    if kind == 'index':
+        return Post.objects.all()
+    return Post.objects.filter(**{f'{kind}_id': pk})
+
+
+def recount(feed):
+    count = feed_posts(feed).count()
+    shared_cache().set(
+        feed_cache_key(feed), count, settings.FEED_COUNT_TIMEOUT
+    )
+    return count
+
+
+@task(priority=5)
+def recount_feed(feed):
+    """Точный пересчет ленты, которую показали с оценкой."""
+    recount(feed)
+
+
+def feed_count(feed):
+    """
+    Число постов ленты и признак приблизительности.
+    Точные счетчики лежат в общем для процессов кэше и меняются
+    сигналами постов. Ленты группы и автора при промахе считаются
+    сразу по индексу, одним запросом на все одновременные промахи.
+    Для главной ленты отдается оценка по статистике базы, а точный
+    пересчет всей таблицы уходит в очередь задач; без статистики она
+    тоже считается сразу. Оценка кэшируется на FEED_ESTIMATE_TIMEOUT
+    секунд, и задача ставится только тем запросом, который положил
+    ее в кэш, поэтому чтение ленты не пишет в очередь на каждом
+    просмотре. Если задачу за это время никто не выполнил, она
+    ставится снова. Раз в FEED_COUNT_TIMEOUT счетчик пересчитывается,
+    чтобы не копить расхождение от массовых операций в обход сигналов.
+    """
+    cache = shared_cache()
+    count = cache.get(feed_cache_key(feed))
+    if count is not None:
+        return count, False
+    estimate = None
+    if feed == 'index':
+        estimate_key = f'{feed_cache_key(feed)}:estimate'
+        estimate = cache.get(estimate_key)
+        if estimate is not None:
+            return estimate, True
+        estimate = estimate_rows(Post)
+    if estimate is None:
+        return coalesce(
+            feed_cache_key(feed), lambda: recount(feed),
+            using=settings.SHARED_CACHE_ALIAS,
+        ), False
+    if cache.add(estimate_key, estimate, settings.FEED_ESTIMATE_TIMEOUT):
+        recount_feed.delay(feed, dedup_key=f'recount_feed:{feed}')
+    return estimate, True
+
+
+def follow_count(user_id):
+    """
+    Число постов в ленте подписок: сумма счетчиков авторов.
+    Недостающие счетчики считаются одним запросом с GROUP BY.
+    """
+    keys = {
+        feed_cache_key(f'author:{author_id}'): author_id
+        for author_id in Follow.objects.filter(
+            user_id=user_id
+        ).values_list('author_id', flat=True)
+    }
+    cache = shared_cache()
+    counts = cache.get_many(keys)
+    missing = [
+        author_id for key, author_id in keys.items() if key not in counts
+    ]
+    if missing:
+        fresh = dict(
+            Post.objects.filter(author_id__in=missing)
+            .order_by()
+            .values('author_id')
+            .annotate(posts=Count('id'))
+            .values_list('author_id', 'posts')
+        )
+        fresh = {
+            feed_cache_key(f'author:{author_id}'): fresh.get(author_id, 0)
+            for author_id in missing
+        }
+        cache.set_many(fresh, settings.FEED_COUNT_TIMEOUT)
+        counts.update(fresh)
+    return sum(counts.values())
+
+
+def change_feed_counts(feeds, delta):
+    """
+    Сдвигает счетчики, которые уже есть в общем кэше, поэтому
+    новый пост сразу виден в счетчиках всех процессов.
+    """
+    cache = shared_cache()
+    for feed in feeds:
+        try:
+            cache.incr(feed_cache_key(feed), delta)
+        except ValueError:
+            pass
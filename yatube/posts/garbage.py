@@ -0,0 +1,250 @@
+import os
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+
+from django.db import transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post, StoredImage
+from .storage import image_storage
+
+
+class Report:
+    def __init__(self):
+        self.originals = 0
+        self.originals_size = 0
+        self.thumbnails = 0
+        self.thumbnails_size = 0
+
+
+def walk(root, directory):
+    """
+    Обходит файлы каталога рекурсивно, не собирая их в список.
+    Возвращает (имя относительно root, размер, время изменения).
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = os.scandir(os.path.join(root, current))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                name = posixpath.join(current, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(name)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    yield name, stat.st_size, stat.st_mtime
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def old_enough(files, min_age):
+    """Не трогает свежие файлы: их пост может еще сохраняться."""
+    deadline = time.time() - min_age
+    return [item for item in files if item[2] <= deadline]
+
+
+def still_old(storage, files, min_age):
+    """
+    Повторная проверка возраста перед удалением: повторная загрузка
+    того же файла обновляет его время изменения уже после обхода.
+    """
+    deadline = time.time() - min_age
+    kept = []
+    for name, size, _ in files:
+        try:
+            mtime = os.stat(storage.path(name)).st_mtime
+        except FileNotFoundError:
+            continue
+        if mtime <= deadline:
+            kept.append((name, size, mtime))
+    return kept
+
+
+def known_thumbnails(names):
+    """Имена миниатюр, о которых знает key-value хранилище sorl."""
+    keys = {
+        add_prefix(ImageFile(name, default.storage).key): name
+        for name in names
+    }
+    if isinstance(default.kvstore, KVStore):
+        found = KVStoreModel.objects.filter(
+            key__in=list(keys)
+        ).values_list('key', flat=True)
+    else:
+        found = [key for key in keys if default.kvstore._get_raw(key)]
+    return {keys[key] for key in found}
+
+
+def thumbnails_of(name):
+    """Миниатюры оригинала и ключи, которые нужно удалить вместе с ним."""
+    source = ImageFile(name, image_storage)
+    files = []
+    keys = [add_prefix(source.key), add_prefix(source.key, 'thumbnails')]
+    for key in default.kvstore._get(source.key, identity='thumbnails') or []:
+        thumbnail = default.kvstore._get(key)
+        if thumbnail:
+            files.append(thumbnail.name)
+        keys.append(add_prefix(key))
+    return files, keys
+
+
+def unreferenced(names):
+    """Имена, на которые не ссылается ни один пост."""
+    referenced = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    return [name for name in names if name not in referenced]
+
+
+def collect_released(report, batch_size, min_age, dry_run):
+    """
+    Оригиналы из строк StoredImage с нулем ссылок. Строки пачки
+    блокируются до конца удаления, ссылки перепроверяются по постам,
+    а возраст - по времени изменения файла, которое обновляет
+    повторная загрузка. Строки удаляются вместе с файлами.
+    """
+    last = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                StoredImage.objects.select_for_update()
+                .filter(refs=0, pk__gt=last)
+                .order_by('pk')
+                .values_list('pk', 'name')[:batch_size]
+            )
+            if not rows:
+                return
+            last = rows[-1][0]
+            deadline = time.time() - min_age
+            garbage, missing = [], []
+            for name in unreferenced([name for _, name in rows]):
+                try:
+                    stat = os.stat(image_storage.path(name))
+                except FileNotFoundError:
+                    missing.append(name)
+                    continue
+                if stat.st_mtime <= deadline:
+                    garbage.append(name)
+                    report.originals_size += stat.st_size
+            report.originals += len(garbage)
+            yield garbage
+            if not dry_run:
+                StoredImage.objects.filter(
+                    name__in=garbage + missing, refs=0
+                ).delete()
+
+
+def collect_untracked(report, batch_size, min_age):
+    """
+    Оригиналы в posts/ без строки StoredImage и без постов:
+    прерванные загрузки и файлы, сохраненные до учета ссылок.
+    Требует обхода всего каталога.
+    """
+    files = walk(image_storage.location, 'posts')
+    for batch in batches(files, batch_size):
+        batch = old_enough(batch, min_age)
+        names = [name for name, _, _ in batch]
+        tracked = set(
+            StoredImage.objects.filter(name__in=names)
+            .values_list('name', flat=True)
+        )
+        names = set(unreferenced(
+            [name for name in names if name not in tracked]
+        ))
+        garbage = still_old(
+            image_storage,
+            [item for item in batch if item[0] in names],
+            min_age,
+        )
+        report.originals += len(garbage)
+        report.originals_size += sum(size for _, size, _ in garbage)
+        yield [name for name, _, _ in garbage]
+
+
+def collect_thumbnails(report, batch_size, min_age):
+    """Файлы миниатюр, которых нет в key-value хранилище sorl."""
+    files = walk(default.storage.location, thumbnail_settings.THUMBNAIL_PREFIX)
+    for batch in batches(files, batch_size):
+        batch = old_enough(batch, min_age)
+        known = known_thumbnails([name for name, _, _ in batch])
+        garbage = [item for item in batch if item[0] not in known]
+        report.thumbnails += len(garbage)
+        report.thumbnails_size += sum(size for _, size, _ in garbage)
+        yield [name for name, _, _ in garbage]
+
+
+def delete_files(pool, storage, names):
+    list(pool.map(storage.delete, names))
+
+
+def delete_originals(pool, report, names, dry_run, on_garbage):
+    """Удаляет оригиналы вместе с их миниатюрами и записями sorl."""
+    thumbnails, keys = [], []
+    for name in names:
+        files, raw_keys = thumbnails_of(name)
+        thumbnails.extend(files)
+        keys.extend(raw_keys)
+    report.thumbnails += len(thumbnails)
+    if on_garbage is not None:
+        on_garbage(names + thumbnails)
+    if dry_run:
+        return
+    if keys:
+        default.kvstore._delete_raw(*keys)
+    delete_files(pool, default.storage, thumbnails)
+    delete_files(pool, image_storage, names)
+
+
+def collect_garbage(
+    dry_run=False, batch_size=1000, min_age=3600, workers=4, on_garbage=None,
+    kvstore_cleanup=False, scan=False,
+):
+    """
+    Находит и удаляет картинки, на которые не ссылаются посты,
+    вместе с их миниатюрами и записями sorl, а также миниатюры,
+    о которых sorl уже не знает. Кандидаты в оригиналы берутся
+    из строк StoredImage с нулем ссылок; scan дополнительно обходит
+    каталог posts/ в поисках файлов без строк. Файлы и посты
+    просматриваются пачками по batch_size, файлы удаляются
+    в workers потоков.
+    Файлы моложе min_age секунд не трогаются. on_garbage
+    вызывается с именами каждой найденной пачки мусора.
+    kvstore_cleanup дополнительно запускает cleanup() хранилища sorl,
+    который читает все его ключи разом и проверяет каждый исходник,
+    поэтому на большом хранилище он выключен по умолчанию.
+    """
+    report = Report()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        originals = collect_released(report, batch_size, min_age, dry_run)
+        if scan:
+            originals = chain(
+                originals, collect_untracked(report, batch_size, min_age)
+            )
+        for names in originals:
+            delete_originals(pool, report, names, dry_run, on_garbage)
+        for names in collect_thumbnails(report, batch_size, min_age):
+            if on_garbage is not None:
+                on_garbage(names)
+            if not dry_run:
+                delete_files(pool, default.storage, names)
+    if kvstore_cleanup and not dry_run:
+        default.kvstore.cleanup()
+    return report
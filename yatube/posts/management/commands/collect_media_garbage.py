@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+
+from posts.garbage import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые больше нет ссылок, '
+        'их миниатюры и записи sorl-thumbnail.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Сколько потоков удаляют файлы.',
+        )
+        parser.add_argument(
+            '--scan',
+            action='store_true',
+            help=(
+                'Обойти каталог posts/ в поисках картинок, которые '
+                'не учтены в StoredImage.'
+            ),
+        )
+        parser.add_argument(
+            '--kvstore-cleanup',
+            action='store_true',
+            help=(
+                'Проверить все записи sorl-thumbnail на существование '
+                'исходников. Читает все ключи в память.'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        verbose = options['verbosity'] > 1 or options['dry_run']
+        report = collect_garbage(
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+            min_age=options['min_age'],
+            workers=options['workers'],
+            on_garbage=self.print_names if verbose else None,
+            kvstore_cleanup=options['kvstore_cleanup'],
+            scan=options['scan'],
+        )
+        action = 'К удалению' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{action}: оригиналов {report.originals} '
+            f'({report.originals_size} байт), '
+            f'миниатюр {report.thumbnails}'
+        )
+
+    def print_names(self, names):
+        for name in names:
+            self.stdout.write(name)
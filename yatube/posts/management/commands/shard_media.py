@@ -0,0 +1,113 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, Value, When
+from sorl.thumbnail import default
+
+from posts.garbage import thumbnails_of
+from posts.models import Post, StoredImage
+from posts.storage import image_storage, is_sharded
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога posts/ '
+        'в подкаталоги по хэшу содержимого и обновляет Post.image.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько файлов переносить за одну транзакцию.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        moved = missing = 0
+        last = ''
+        while True:
+            names = list(
+                Post.objects.exclude(image='')
+                .filter(image__gt=last)
+                .order_by('image')
+                .values_list('image', flat=True)
+                .distinct()[:batch_size]
+            )
+            if not names:
+                break
+            last = names[-1]
+            renames = {}
+            for name in names:
+                if is_sharded(name):
+                    continue
+                if not image_storage.exists(name):
+                    missing += 1
+                    continue
+                renames[name] = self.link(name)
+            if renames:
+                self.rewrite(renames)
+                self.forget(renames)
+                for name in renames:
+                    image_storage.delete(name)
+                moved += len(renames)
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, не найдено: {missing}'
+        )
+
+    def link(self, name):
+        """Создает файл под новым именем, не трогая старый."""
+        with image_storage.open(name) as content:
+            target = image_storage.content_name(name, content)
+        target_path = image_storage.path(target)
+        if not image_storage.exists(target):
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            try:
+                os.link(image_storage.path(name), target_path)
+            except OSError:
+                shutil.copyfile(image_storage.path(name), target_path)
+        return target
+
+    def forget(self, names):
+        """
+        Удаляет миниатюры старых имен и их записи sorl: после
+        переименования на них никто не ссылается, а по новому
+        имени sorl построит миниатюры заново.
+        """
+        thumbnails, keys = [], []
+        for name in names:
+            files, raw_keys = thumbnails_of(name)
+            thumbnails.extend(files)
+            keys.extend(raw_keys)
+        if keys:
+            default.kvstore._delete_raw(*keys)
+        for name in thumbnails:
+            default.storage.delete(name)
+
+    def rewrite(self, renames):
+        """Одним запросом переписывает Post.image и пересчитывает ссылки."""
+        targets = set(renames.values())
+        with transaction.atomic():
+            Post.objects.filter(image__in=renames).update(
+                image=Case(
+                    *(
+                        When(image=old, then=Value(new))
+                        for old, new in renames.items()
+                    )
+                )
+            )
+            StoredImage.objects.filter(
+                name__in=set(renames) | targets
+            ).delete()
+            refs = (
+                Post.objects.filter(image__in=targets)
+                .order_by()
+                .values_list('image')
+                .annotate(refs=Count('id'))
+            )
+            StoredImage.objects.bulk_create(
+                StoredImage(name=name, refs=total) for name, total in refs
+            )
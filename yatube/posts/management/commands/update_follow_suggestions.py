@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import update_suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации подписок для пользователей, '
+        'чье окружение в графе подписок изменилось.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рекомендации для всех пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        updated = update_suggestions(full=options['full'])
+        self.stdout.write(f'Пересчитано пользователей: {updated}')
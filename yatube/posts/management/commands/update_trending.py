@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.trending import update_trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинги популярных постов и групп.'
+
+    def handle(self, *args, **options):
+        updated = update_trending()
+        self.stdout.write(f'Постов с новыми событиями: {updated}')
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('updated', models.DateTimeField(verbose_name='Дата пересчета')),
+            ],
+            options={
+                'verbose_name': 'Пересчет популярного',
+                'verbose_name_plural': 'Пересчеты популярного',
+            },
+        ),
+        migrations.RemoveField(
+            model_name='trendingpost',
+            name='views_seen',
+        ),
+        migrations.CreateModel(
+            name='PostViewDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('views', models.PositiveIntegerField(verbose_name='Просмотры')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_deltas', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Прирост просмотров',
+                'verbose_name_plural': 'Приросты просмотров',
+            },
+        ),
+    ]
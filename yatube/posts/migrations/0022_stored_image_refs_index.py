@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_view_deltas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='storedimage',
+            name='refs',
+            field=models.PositiveIntegerField(db_index=True, default=0, verbose_name='Ссылок'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:05
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_run(apps, schema_editor):
+    """
+    Первый пересчет не должен считать новыми подписки, которым
+    миграция 0014 проставила created временем миграции: отсчет
+    идет от последнего пересчета или от текущего момента.
+    """
+    TrendingPost = apps.get_model('posts', 'TrendingPost')
+    TrendingRun = apps.get_model('posts', 'TrendingRun')
+    if TrendingRun.objects.exists():
+        return
+    last = TrendingPost.objects.aggregate(last=models.Max('updated'))['last']
+    TrendingRun.objects.create(updated=last or timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_stored_image_refs_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_run, migrations.RunPython.noop),
+    ]
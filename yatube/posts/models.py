@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import models, transaction
+from django.db.models import F, UniqueConstraint
+
+from .storage import image_storage
 
 User = get_user_model()
 
+COMMENT_SEGMENT_WIDTH = 7
+COMMENT_MAX_DEPTH = 10
+
 
 class Group(models.Model):
     """
@@ -61,11 +66,35 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=image_storage,
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, blank=True, editable=False
+    )
+    image_placeholder = models.TextField(blank=True, editable=False)
+    views = models.PositiveIntegerField(
+        verbose_name='Просмотры',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'], name='post_feed_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_feed_idx',
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -73,10 +102,46 @@ class Post(models.Model):
         return self.text[:15]
 
 
+class StoredImage(models.Model):
+    """
+    Файл картинки в хранилище и число постов, которые на него ссылаются.
+    Одинаковые загрузки хранятся одним файлом. Строки с нулем ссылок -
+    кандидаты для сборщика мусора collect_media_garbage.
+    """
+
+    name = models.CharField(
+        verbose_name='Имя файла', max_length=255, unique=True
+    )
+    refs = models.PositiveIntegerField(
+        verbose_name='Ссылок', default=0, db_index=True
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name} ({self.refs})'
+
+    @classmethod
+    def change_refs(cls, name, delta):
+        if not name:
+            return
+        images = cls.objects.filter(name=name)
+        if delta < 0:
+            images = images.filter(refs__gte=-delta)
+        updated = images.update(refs=F('refs') + delta)
+        if not updated and delta > 0:
+            cls.objects.get_or_create(name=name, defaults={'refs': 0})
+            cls.objects.filter(name=name).update(refs=F('refs') + delta)
+
+
 class Comment(models.Model):
 
     text = models.TextField(verbose_name='Текст')
-    created = models.DateTimeField('post create date', auto_now_add=True)
+    created = models.DateTimeField(
+        'post create date', auto_now_add=True, db_index=True
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -90,15 +155,88 @@ class Comment(models.Model):
         related_name='post_comment',
         verbose_name='Принадлежность к посту'
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на комментарий',
+    )
+    path = models.CharField(
+        verbose_name='Путь в ветке',
+        max_length=255,
+        blank=True,
+        editable=False,
+    )
+    reply_count = models.PositiveIntegerField(
+        verbose_name='Ответов в ветке',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-created',)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            ),
+            models.Index(fields=['post', 'path'], name='comment_path_idx'),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
     def __str__(self):
         return self.text[:15]
 
+    @staticmethod
+    def segment(pk):
+        """
+        Сегмент пути: id в base36 фиксированной ширины, поэтому
+        сортировка путей как строк совпадает с порядком ответов.
+        """
+        digits = ''
+        while pk:
+            pk, digit = divmod(pk, 36)
+            digits = '0123456789abcdefghijklmnopqrstuvwxyz'[digit] + digits
+        return digits.rjust(COMMENT_SEGMENT_WIDTH, '0')
+
+    @property
+    def depth(self):
+        return len(self.path) // COMMENT_SEGMENT_WIDTH - 1
+
+    def ancestor_paths(self):
+        return [
+            self.path[:end]
+            for end in range(
+                COMMENT_SEGMENT_WIDTH, len(self.path), COMMENT_SEGMENT_WIDTH
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Новому комментарию после вставки записывается путь
+        в ветке, а счетчики ответов его предков увеличиваются
+        одним запросом.
+        """
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        if self.parent_id and self.parent.depth >= COMMENT_MAX_DEPTH:
+            deepest = COMMENT_MAX_DEPTH * COMMENT_SEGMENT_WIDTH
+            self.parent = Comment.objects.get(
+                post_id=self.post_id, path=self.parent.path[:deepest]
+            )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            prefix = self.parent.path if self.parent_id else ''
+            self.path = prefix + self.segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+            if self.parent_id:
+                Comment.objects.filter(
+                    post_id=self.post_id, path__in=self.ancestor_paths()
+                ).update(reply_count=F('reply_count') + 1)
+
 
 class Follow(models.Model):
 
@@ -114,6 +252,9 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор',
     )
+    created = models.DateTimeField(
+        'follow create date', auto_now_add=True, db_index=True
+    )
 
     class Meta:
         verbose_name = 'Подписка'
@@ -122,3 +263,144 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} following {self.author}'
+
+
+class TrendingPost(models.Model):
+    """
+    Материализованный рейтинг популярных постов.
+    Заполняется командой update_trending: к затухающему со временем
+    рейтингу добавляются новые комментарии, просмотры и подписки
+    на автора, накопившиеся с прошлого запуска.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост',
+    )
+    score = models.FloatField(verbose_name='Рейтинг', db_index=True)
+    updated = models.DateTimeField(verbose_name='Дата пересчета')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+    def __str__(self):
+        return f'{self.post} ({self.score:.2f})'
+
+
+class PostViewDelta(models.Model):
+    """
+    Прирост просмотров поста из одного сброса счетчика.
+    update_trending суммирует накопившиеся строки и удаляет их,
+    поэтому таблица хранит только просмотры с прошлого пересчета.
+    """
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='view_deltas',
+        verbose_name='Пост',
+    )
+    views = models.PositiveIntegerField(verbose_name='Просмотры')
+
+    class Meta:
+        verbose_name = 'Прирост просмотров'
+        verbose_name_plural = 'Приросты просмотров'
+
+    def __str__(self):
+        return f'{self.post}: +{self.views}'
+
+
+class TrendingRun(models.Model):
+    """
+    Время последнего пересчета популярного. Хранится отдельно,
+    потому что строки TrendingPost с затухшим рейтингом удаляются.
+    """
+
+    updated = models.DateTimeField(verbose_name='Дата пересчета')
+
+    class Meta:
+        verbose_name = 'Пересчет популярного'
+        verbose_name_plural = 'Пересчеты популярного'
+
+    def __str__(self):
+        return f'Пересчет {self.updated:%Y-%m-%d %H:%M}'
+
+
+class TrendingGroup(models.Model):
+    """
+    Материализованный рейтинг популярных групп:
+    сумма рейтингов популярных постов группы.
+    """
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Группа',
+    )
+    score = models.FloatField(verbose_name='Рейтинг', db_index=True)
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Популярная группа'
+        verbose_name_plural = 'Популярные группы'
+
+    def __str__(self):
+        return f'{self.group} ({self.score:.2f})'
+
+
+class FollowSuggestion(models.Model):
+    """
+    Предрасчитанные рекомендации авторов для подписки.
+    Заполняется командой update_follow_suggestions.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рекомендуемый автор',
+    )
+    score = models.FloatField(verbose_name='Рейтинг')
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user} may follow {self.author}'
+
+
+class StaleSuggestions(models.Model):
+    """
+    Пользователи, чье окружение в графе подписок изменилось
+    и чьи рекомендации нужно пересчитать.
+    Хранит id без внешнего ключа: отметка может появиться
+    во время каскадного удаления пользователя.
+    """
+
+    user_id = models.IntegerField(
+        verbose_name='Пользователь', primary_key=True
+    )
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
@@ -0,0 +1,53 @@
+import base64
+from io import BytesIO
+
+from django.core.exceptions import SuspiciousFileOperation
+from PIL import Image, ImageOps
+
+# Пропорции миниатюры ленты 960x339, браузер сам размоет
+# растянутую картинку.
+PLACEHOLDER_SIZE = (17, 6)
+DRAFT_SIZE = (PLACEHOLDER_SIZE[0] * 4, PLACEHOLDER_SIZE[1] * 4)
+EXIF_ORIENTATION = 0x0112
+ROTATED = (5, 6, 7, 8)
+
+
+def image_preview(file):
+    """
+    Размеры картинки с учетом поворота по EXIF и крошечное превью
+    в виде data URI для подстановки до загрузки миниатюры.
+    Для файлов, которые не удалось прочитать, возвращает None.
+    """
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in ROTATED:
+                width, height = height, width
+            image.draft('RGB', DRAFT_SIZE)
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            preview = ImageOps.fit(image, PLACEHOLDER_SIZE, Image.BICUBIC)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        file.seek(0)
+    buffer = BytesIO()
+    preview.save(buffer, 'PNG', optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return width, height, f'data:image/png;base64,{encoded}'
+
+
+def field_file_preview(field_file):
+    """
+    image_preview для значения ImageField: только что загруженный
+    файл читается из памяти, сохраненный - из хранилища.
+    """
+    if not field_file:
+        return None
+    if not field_file._committed:
+        return image_preview(field_file.file)
+    try:
+        with field_file.storage.open(field_file.name) as file:
+            return image_preview(file)
+    except (OSError, SuspiciousFileOperation):
+        return None
@@ -0,0 +1,87 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.http import Http404
+
+from core.localcache import LocalCache
+
+from .models import Group
+
+User = get_user_model()
+
+
+class Registry:
+    """
+    Поиск объекта по уникальному полю (slug, username) без запроса
+    к базе. Снимок нужных полей лежит в кэше процесса, за ним в общем
+    кэше Django, и только при двойном промахе читается из базы.
+    Снимки сбрасываются сигналами при изменении и удалении объекта;
+    локальный кэш других процессов догонит их не позже чем через
+    REGISTRY_LOCAL_CACHE_TIMEOUT секунд.
+    """
+
+    def __init__(self, name, model, field, fields):
+        self.name = name
+        self.model = model
+        self.field = field
+        self.fields = fields
+        self.local = LocalCache(
+            max_size=settings.REGISTRY_LOCAL_CACHE_SIZE,
+            timeout=settings.REGISTRY_LOCAL_CACHE_TIMEOUT,
+        )
+
+    def cache_key(self, value):
+        # Slug и имя пользователя могут содержать пробелы и кириллицу,
+        # недопустимые в ключах memcached.
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'registry:{self.name}:{digest}'
+
+    def restore(self, values):
+        """Объект из снимка, остальные поля догрузятся при обращении."""
+        return self.model.from_db(
+            router.db_for_read(self.model), self.fields, values
+        )
+
+    def get(self, value):
+        key = self.cache_key(value)
+        values = self.local.get(key)
+        if values is None:
+            values = cache.get(key)
+        if values is None:
+            values = (
+                self.model.objects
+                .filter(**{self.field: value})
+                .values_list(*self.fields)
+                .first()
+            )
+            if values is None:
+                return None
+            cache.set(key, values, settings.REGISTRY_CACHE_TIMEOUT)
+        self.local.set(key, values)
+        return self.restore(values)
+
+    def get_or_404(self, value):
+        obj = self.get(value)
+        if obj is None:
+            raise Http404(
+                f'{self.model._meta.object_name} {value!r} не найден'
+            )
+        return obj
+
+    def forget(self, *values):
+        keys = [self.cache_key(value) for value in values if value]
+        for key in keys:
+            self.local.delete(key)
+        cache.delete_many(keys)
+
+
+groups = Registry(
+    'group', Group, 'slug', ['id', 'title', 'slug', 'description']
+)
+authors = Registry(
+    'author', User, 'username', ['id', 'username', 'first_name', 'last_name']
+)
+registries = {Group: groups, User: authors}
@@ -0,0 +1,147 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from core.pagecache import forget_user_state
+
+from .counters import change_feed_counts, post_feeds
+from .models import Comment, Follow, Group, Post, StoredImage
+from .placeholders import field_file_preview
+from .registry import registries
+from .suggestions import mark_group_stale, mark_stale
+from .tasks import warm_thumbnails
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    mark_stale(instance.user_id)
+    forget_user_state(instance.user_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.parent_id:
+        Comment.objects.filter(
+            post_id=instance.post_id, path__in=instance.ancestor_paths()
+        ).update(reply_count=F('reply_count') - 1)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._stored_image = getattr(image, 'name', image) or ''
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    instance._stored_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def post_group_suggestions(sender, instance, created, **kwargs):
+    """
+    Новая пара автор - группа меняет рекомендации подписок.
+    Подключен раньше post_feeds_saved, который обновляет
+    _stored_group_id.
+    """
+    old_group_id = None if created else instance._stored_group_id
+    if instance.group_id == old_group_id:
+        return
+    posts = Post.objects.filter(author_id=instance.author_id)
+    if instance.group_id and not posts.filter(
+        group_id=instance.group_id
+    ).exclude(pk=instance.pk).exists():
+        mark_group_stale(instance.author_id, instance.group_id)
+    if old_group_id and not posts.filter(group_id=old_group_id).exists():
+        mark_group_stale(instance.author_id, old_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_group_deleted(sender, instance, **kwargs):
+    if instance.group_id and not Post.objects.filter(
+        author_id=instance.author_id, group_id=instance.group_id
+    ).exists():
+        mark_group_stale(instance.author_id, instance.group_id)
+
+
+@receiver(post_save, sender=Post)
+def post_feeds_saved(sender, instance, created, **kwargs):
+    if created:
+        change_feed_counts(
+            post_feeds(instance.author_id, instance.group_id), 1
+        )
+    elif instance.group_id != instance._stored_group_id:
+        if instance._stored_group_id:
+            change_feed_counts([f'group:{instance._stored_group_id}'], -1)
+        if instance.group_id:
+            change_feed_counts([f'group:{instance.group_id}'], 1)
+    instance._stored_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def post_feeds_deleted(sender, instance, **kwargs):
+    change_feed_counts(post_feeds(instance.author_id, instance.group_id), -1)
+
+
+@receiver(pre_save, sender=Post)
+def post_image_preview(sender, instance, **kwargs):
+    image = instance.image
+    unchanged = (
+        image._committed
+        and (image.name or '') == getattr(instance, '_stored_image', '')
+    )
+    if unchanged and (not image or instance.image_width is not None):
+        return
+    preview = field_file_preview(image) or (None, None, '')
+    (
+        instance.image_width,
+        instance.image_height,
+        instance.image_placeholder,
+    ) = preview
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, created, **kwargs):
+    old = '' if created else getattr(instance, '_stored_image', '')
+    new = instance.image.name or ''
+    if old != new:
+        StoredImage.change_refs(new, 1)
+        StoredImage.change_refs(old, -1)
+        instance._stored_image = new
+        if new:
+            warm_thumbnails.delay(
+                instance.pk, dedup_key=f'warm_thumbnails:{instance.pk}'
+            )
+
+
+@receiver(post_delete, sender=Post)
+def post_image_deleted(sender, instance, **kwargs):
+    StoredImage.change_refs(getattr(instance, '_stored_image', ''), -1)
+
+
+@receiver(post_init, sender=Group)
+@receiver(post_init, sender=User)
+def remember_registry_value(sender, instance, **kwargs):
+    """
+    Значение поля реестра при загрузке: после переименования
+    из реестра удаляется и старое значение.
+    """
+    field = registries[sender].field
+    instance._registry_old = instance.__dict__.get(field)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=User)
+def registry_changed(sender, instance, **kwargs):
+    registry = registries[sender]
+    value = getattr(instance, registry.field)
+    registry.forget(value, getattr(instance, '_registry_old', None))
+    instance._registry_old = value
@@ -0,0 +1,52 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARD_PATTERN = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+def shard(digest):
+    return f'{digest[:2]}/{digest[2:4]}/{digest}'
+
+
+def is_sharded(name):
+    return bool(SHARD_PATTERN.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище картинок постов, адресуемое содержимым.
+    Файл сохраняется под sha256 своего содержимого в каталоге upload_to,
+    разложенным по подкаталогам из первых символов хэша:
+    posts/ab/cd/abcd....jpg. Так в одном каталоге не копятся
+    миллионы файлов.
+    Если такой файл уже есть, повторная загрузка его переиспользует,
+    а вместе с ним и все уже созданные миниатюры. Время изменения
+    файла при этом обновляется, чтобы сборщик мусора считал его
+    свежим, пока пост с ним сохраняется.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name), shard(digest.hexdigest()) + extension
+        )
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super()._save(name, content)
+        return name
+
+
+image_storage = ContentAddressedStorage()
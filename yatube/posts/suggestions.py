@@ -0,0 +1,139 @@
+import heapq
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Follow, FollowSuggestion, Post, StaleSuggestions
+
+User = get_user_model()
+
+FRIEND_WEIGHT = 1.0
+GROUP_WEIGHT = 0.5
+BATCH_SIZE = 500
+
+
+class FollowGraph:
+    """
+    Граф подписок в памяти.
+    Подписки каждого пользователя хранятся компактными массивами,
+    группы авторов - множествами. Граф строится двумя
+    последовательными запросами и дальше обходится без базы.
+    """
+
+    def __init__(self):
+        self.following = defaultdict(lambda: array('l'))
+        self.author_groups = defaultdict(set)
+        self.group_authors = defaultdict(lambda: array('l'))
+        follows = (
+            Follow.objects.order_by()
+            .values_list('user_id', 'author_id')
+            .iterator()
+        )
+        for user_id, author_id in follows:
+            self.following[user_id].append(author_id)
+        posts = (
+            Post.objects.filter(group__isnull=False)
+            .order_by()
+            .values_list('author_id', 'group_id')
+            .distinct()
+            .iterator()
+        )
+        for author_id, group_id in posts:
+            self.author_groups[author_id].add(group_id)
+            self.group_authors[group_id].append(author_id)
+
+    def suggest(self, user_id, amount):
+        """
+        Рекомендации для пользователя: авторы, на которых подписаны
+        его авторы, и авторы групп, в которых пишут его авторы.
+        """
+        followed = set(self.following.get(user_id, ()))
+        scores = defaultdict(float)
+        groups = set()
+        for author_id in followed:
+            for candidate in self.following.get(author_id, ()):
+                scores[candidate] += FRIEND_WEIGHT
+            groups |= self.author_groups.get(author_id, set())
+        for group_id in groups:
+            for candidate in self.group_authors[group_id]:
+                scores[candidate] += GROUP_WEIGHT
+        for excluded in followed | {user_id}:
+            scores.pop(excluded, None)
+        return heapq.nlargest(amount, scores.items(), key=lambda x: x[1])
+
+
+def _write(graph, user_ids, amount):
+    suggestions = [
+        FollowSuggestion(user_id=user_id, author_id=author_id, score=score)
+        for user_id in user_ids
+        for author_id, score in graph.suggest(user_id, amount)
+    ]
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        FollowSuggestion.objects.bulk_create(suggestions)
+
+
+def update_suggestions(full=False):
+    """
+    Пересчитывает рекомендации подписок.
+    По умолчанию только для пользователей из StaleSuggestions,
+    с full=True - для всех пользователей.
+    Возвращает количество обработанных пользователей.
+    """
+    if full:
+        StaleSuggestions.objects.all().delete()
+        user_ids = list(User.objects.values_list('id', flat=True))
+    else:
+        with transaction.atomic():
+            user_ids = list(
+                StaleSuggestions.objects.values_list('user_id', flat=True)
+            )
+            StaleSuggestions.objects.filter(user_id__in=user_ids).delete()
+        user_ids = list(
+            User.objects.filter(id__in=user_ids).values_list('id', flat=True)
+        )
+    if not user_ids:
+        return 0
+    graph = FollowGraph()
+    amount = settings.FOLLOW_SUGGESTIONS_AMOUNT
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        _write(graph, user_ids[start:start + BATCH_SIZE], amount)
+    return len(user_ids)
+
+
+def _mark(user_ids):
+    StaleSuggestions.objects.bulk_create(
+        [StaleSuggestions(user_id=pk) for pk in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def mark_stale(user_id):
+    """
+    Помечает устаревшими рекомендации пользователя и его подписчиков:
+    у подписчиков изменились авторы второго круга.
+    """
+    user_ids = set(
+        Follow.objects.filter(author_id=user_id)
+        .values_list('user_id', flat=True)
+    )
+    user_ids.add(user_id)
+    _mark(user_ids)
+
+
+def mark_group_stale(author_id, group_id):
+    """
+    Автор начал или перестал писать в группе. Устаревают
+    рекомендации его подписчиков (у их авторов другие группы)
+    и подписчиков остальных авторов группы (в группе другие авторы).
+    """
+    group_authors = Post.objects.filter(group_id=group_id).values('author')
+    _mark(set(
+        Follow.objects.filter(
+            Q(author_id=author_id) | Q(author__in=group_authors)
+        ).values_list('user_id', flat=True)
+    ))
@@ -0,0 +1,12 @@
+from core.tasks import task
+
+from .models import Post
+from .thumbnails import attach_thumbnails
+
+
+@task
+def warm_thumbnails(post_id):
+    """Строит миниатюру ленты заранее, чтобы ее не ждал первый читатель."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        attach_thumbnails([post])
@@ -0,0 +1,210 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments_count = settings.COMMENTS_AMOUNT_ON_PAGE + 5
+        for number in range(cls.comments_count):
+            Comment.objects.create(
+                author=cls.author, post=cls.post, text=str(number)
+            )
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_detail_renders_first_page(self):
+        """Страница поста выводит только первую страницу комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertEqual(
+            len(response.context['comments']),
+            settings.COMMENTS_AMOUNT_ON_PAGE,
+        )
+        self.assertIsNotNone(response.context['comments_cursor'])
+
+    def test_next_pages_by_cursor(self):
+        """Следующие страницы отдаются по курсору без повторов."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        first = self.client.get(url, {'format': 'json'})
+        cursor = first['X-Next-Cursor']
+        # Без ответов ветки не загружаются, нужен только запрос корней.
+        with self.assertNumQueries(1):
+            second = self.client.get(url, {'format': 'json', 'cursor': cursor})
+        self.assertFalse(second.has_header('X-Next-Cursor'))
+
+        ids = [
+            comment['id']
+            for response in (first, second)
+            for comment in response.json()['comments']
+        ]
+        self.assertEqual(len(set(ids)), self.comments_count)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_next_page_without_js(self):
+        """Следующая страница комментариев открывается страницей поста."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        cursor = self.client.get(url).context['comments_cursor']
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertTemplateUsed(response, 'base.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertIsNone(response.context['comments_cursor'])
+
+    def test_fragment_contains_only_comments(self):
+        """Фрагмент комментариев не содержит обвязки страницы."""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+
+
+class CommentThreadsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def reply(self, parent, text):
+        return Comment.objects.create(
+            author=self.author, post=self.post, parent=parent, text=text
+        )
+
+    def test_paths_and_reply_counts(self):
+        """Ответы получают путь предка и увеличивают счетчики ветки."""
+        root = self.reply(None, 'корень')
+        child = self.reply(root, 'ответ')
+        grandchild = self.reply(child, 'ответ на ответ')
+
+        self.assertTrue(grandchild.path.startswith(child.path))
+        self.assertEqual(grandchild.depth, 2)
+        root.refresh_from_db()
+        child.refresh_from_db()
+        self.assertEqual(root.reply_count, 2)
+        self.assertEqual(child.reply_count, 1)
+
+        grandchild.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+    def test_thread_loads_in_display_order(self):
+        """Ветка загружается одним диапазоном путей в порядке вывода."""
+        first = self.reply(None, 'первый')
+        second = self.reply(None, 'второй')
+        first_reply = self.reply(first, 'ответ первому')
+        nested = self.reply(first_reply, 'вложенный')
+        late_reply = self.reply(first, 'поздний ответ')
+        self.reply(second, 'ответ второму')
+
+        url = reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.id, 'comment_id': first.id},
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'format': 'json'})
+        ids = [comment['id'] for comment in response.json()['comments']]
+        self.assertEqual(
+            ids, [first.id, first_reply.id, nested.id, late_reply.id]
+        )
+
+        page = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'format': 'json'},
+        ).json()['comments']
+        self.assertEqual(page[0]['id'], second.id)
+        self.assertEqual(len(page), 6)
+
+    @override_settings(
+        COMMENT_REPLIES_PREVIEW=2, COMMENT_THREAD_AMOUNT_ON_PAGE=3
+    )
+    def test_large_thread_bounded(self):
+        """Большая ветка выводится частично и догружается по курсору."""
+        root = self.reply(None, 'корень')
+        replies = [self.reply(root, str(number)) for number in range(7)]
+        page = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'format': 'json'},
+        ).json()['comments']
+        self.assertEqual(
+            [comment['id'] for comment in page],
+            [root.id, replies[0].id, replies[1].id],
+        )
+        self.assertEqual(page[0]['reply_count'], 7)
+
+        url = reverse(
+            'posts:comment_thread',
+            kwargs={'post_id': self.post.id, 'comment_id': root.id},
+        )
+        ids, cursor = [], None
+        while True:
+            response = self.client.get(
+                url, {'format': 'json', 'cursor': cursor or ''}
+            )
+            comments = response.json()['comments']
+            self.assertLessEqual(len(comments), 3)
+            ids += [comment['id'] for comment in comments]
+            cursor = response.get('X-Next-Cursor')
+            if cursor is None:
+                break
+        self.assertEqual(ids, [root.id] + [reply.id for reply in replies])
+
+    @override_settings(COMMENT_REPLIES_PREVIEW=2)
+    def test_previews_in_one_query(self):
+        """Превью ответов всех веток страницы читаются одним запросом."""
+        first = self.reply(None, 'первый')
+        second = self.reply(None, 'второй')
+        first_replies = [self.reply(first, str(number)) for number in range(4)]
+        nested = self.reply(first_replies[0], 'вложенный')
+        second_reply = self.reply(second, 'ответ второму')
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'format': 'json'})
+        ids = [comment['id'] for comment in response.json()['comments']]
+        self.assertEqual(ids, [
+            second.id, second_reply.id,
+            first.id, first_replies[0].id, nested.id,
+        ])
+
+    @override_settings(COMMENT_THREAD_AMOUNT_ON_PAGE=2)
+    def test_thread_full_page(self):
+        """Ветка и ее продолжение открываются страницей поста без JS."""
+        root = self.reply(None, 'корень')
+        replies = [self.reply(root, str(number)) for number in range(3)]
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        response = self.client.get(url, {'thread': root.id})
+        self.assertTemplateUsed(response, 'base.html')
+        self.assertEqual(response.context['comments'], [root, replies[0]])
+        cursor = response.context['comments_cursor']
+        self.assertContains(
+            response, f'href="?thread={root.id}&amp;cursor={cursor}#comments"'
+        )
+        response = self.client.get(url, {'thread': root.id, 'cursor': cursor})
+        self.assertEqual(response.context['comments'], replies[1:])
+        self.assertIsNone(response.context['comments_cursor'])
+
+    def test_add_reply(self):
+        """Ответ на комментарий создается через форму поста."""
+        root = self.reply(None, 'корень')
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            data={'text': 'ответ', 'parent': root.id},
+        )
+        self.assertTrue(
+            Comment.objects.filter(parent=root, text='ответ').exists()
+        )
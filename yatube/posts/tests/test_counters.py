@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import shared_cache
+from core.models import Task
+
+from ..counters import ViewCounter, feed_count, follow_count, view_counter
+from ..models import Follow, Group, Post, PostViewDelta
+from ..utils import paginator
+
+User = get_user_model()
+
+
+class ViewCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_hits_are_flushed_in_batch(self):
+        """Просмотры копятся в памяти и сбрасываются в базу."""
+        counter = ViewCounter()
+        counter._flusher = True
+        for _ in range(3):
+            counter.hit(self.post.id)
+        for _ in range(2):
+            counter.hit(self.other_post.id)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+
+        # Savepoint, выбор постов, два UPDATE и одна вставка приростов.
+        with self.assertNumQueries(6):
+            counter.flush()
+        self.post.refresh_from_db()
+        self.other_post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+        self.assertEqual(self.other_post.views, 2)
+        self.assertEqual(
+            dict(PostViewDelta.objects.values_list('post', 'views')),
+            {self.post.id: 3, self.other_post.id: 2},
+        )
+
+    def test_flush_skips_other_database(self):
+        """Просмотры не пишутся в базу, сменившую настроенную."""
+        counter = ViewCounter()
+        counter._flusher = True
+        counter._database = 'other.sqlite3'
+        counter.hit(self.post.id)
+        with self.assertNumQueries(0):
+            counter.flush()
+
+    @override_settings(POST_VIEWS_FLUSH_INTERVAL=None)
+    def test_flusher_disabled(self):
+        """Без интервала поток сброса не запускается."""
+        counter = ViewCounter()
+        counter.hit(self.post.id)
+        self.assertIs(counter._flusher, False)
+        counter.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    def test_post_detail_counts_views(self):
+        """Просмотр страницы поста учитывается счетчиком."""
+        view_counter.flush()
+        self.post.refresh_from_db()
+        views = self.post.views
+        Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        view_counter.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, views + 1)
+
+
+class FeedCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+        for number in range(12):
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        shared_cache().clear()
+
+    def test_counts_cached_and_updated(self):
+        """Счетчики считаются один раз и дальше меняются сигналами."""
+        feeds = ['index', f'author:{self.author.pk}',
+                 f'group:{self.group.pk}', f'group:{self.other_group.pk}']
+        for feed in feeds:
+            feed_count(feed)
+        with self.assertNumQueries(0):
+            counts = [feed_count(feed) for feed in feeds]
+        self.assertEqual(counts, [(12, False), (12, False), (12, False),
+                                  (0, False)])
+        post = Post.objects.create(author=self.author, text='Новый')
+        post.group = self.other_group
+        post.save()
+        Post.objects.filter(group=self.group).first().delete()
+        self.assertEqual(
+            [feed_count(feed)[0] for feed in feeds], [12, 12, 11, 1]
+        )
+
+    def test_estimate_from_statistics(self):
+        """Главная лента оценивается по статистике и пересчитывается."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with self.assertNumQueries(2):
+            count, approximate = feed_count('index')
+        self.assertTrue(approximate)
+        self.assertEqual(count, 12)
+        self.assertTrue(
+            Task.objects.filter(dedup_key='recount_feed:index').exists()
+        )
+        Task.objects.all().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(feed_count('index'), (12, True))
+        self.assertFalse(Task.objects.exists())
+
+    def test_keyed_feeds_counted_exactly(self):
+        """Ленты группы и автора считаются точно, даже со статистикой."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with self.assertNumQueries(1):
+            self.assertEqual(feed_count(f'group:{self.group.pk}'), (12, False))
+        self.assertEqual(
+            feed_count(f'group:{self.other_group.pk}'), (0, False)
+        )
+        self.assertFalse(Task.objects.exists())
+
+    def test_counts_in_shared_cache(self):
+        """Сигналы сдвигают счетчик в общем кэше, который видят все."""
+        feed = f'author:{self.author.pk}'
+        feed_count(feed)
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(shared_cache().get(f'feed_count:{feed}'), 13)
+
+    def test_follow_count(self):
+        """Лента подписок считается по счетчикам авторов."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.assertEqual(follow_count(reader.pk), 12)
+        with self.assertNumQueries(1):
+            self.assertEqual(follow_count(reader.pk), 12)
+
+    def test_stale_count_corrected(self):
+        """Неверный счетчик не прячет посты и уточняется страницей."""
+        posts = Post.objects.all()
+        page = paginator(posts, 5).get_page(2)
+        self.assertEqual(len(page), 2)
+        self.assertTrue(page.has_previous())
+        self.assertEqual(page.paginator.count, 12)
+        self.assertFalse(page.paginator.approximate)
+        page = paginator(posts, 5).get_page(1)
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.paginator.approximate)
+        page = paginator(posts, 100, approximate=True).get_page(5)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(page.paginator.count, 12)
+        self.assertFalse(page.paginator.approximate)
+
+    def test_index_shows_approximate_count(self):
+        """Приблизительное число постов выводится со словом около."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        response = Client().get(reverse('posts:posts_index'))
+        self.assertContains(response, 'Всего: около 12')
+        cache.clear()
+        shared_cache().set('feed_count:index', 30)
+        response = Client().get(reverse('posts:posts_index'))
+        self.assertContains(response, 'Всего: 30')
+        response = Client().get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertContains(response, 'Всего постов: 12')
@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import shared_cache
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedFragmentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.amount = settings.POSTS_AMOUNT_ON_PAGE + 5
+        for number in range(cls.amount):
+            Post.objects.create(
+                author=cls.author, text=f'Пост автора {number}',
+                group=cls.group,
+            )
+        Post.objects.create(author=cls.other, text='Чужой пост')
+
+    def setUp(self):
+        cache.clear()
+        shared_cache().clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def read_feed(self, url):
+        """Проходит ленту по курсорам и возвращает тексты постов."""
+        texts, cursor = [], None
+        while True:
+            response = self.client.get(
+                url, {'cursor': cursor} if cursor else {}
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            texts += [post.text for post in response.context['posts']]
+            cursor = response.get('X-Next-Cursor')
+            if cursor is None:
+                return texts
+
+    def test_feeds_read_by_cursor(self):
+        """Каждая лента отдается порциями без повторов и пропусков."""
+        author_posts = self.amount
+        feeds = {
+            reverse('posts:index_feed'): author_posts + 1,
+            reverse('posts:group_feed', args=['group']): author_posts,
+            reverse('posts:profile_feed', args=['author']): author_posts,
+            reverse('posts:follow_feed'): author_posts,
+        }
+        for url, amount in feeds.items():
+            with self.subTest(url=url):
+                texts = self.read_feed(url)
+                self.assertEqual(len(texts), amount)
+                self.assertEqual(len(set(texts)), amount)
+
+    def test_full_page_links_fragment(self):
+        """Полная страница ведет на догрузку с места, где закончилась."""
+        response = self.client.get(reverse('posts:profile', args=['author']))
+        last = response.context['page_obj'][settings.POSTS_AMOUNT_ON_PAGE - 1]
+        cursor = response.context['feed_cursor']
+        url = reverse('posts:profile_feed', args=['author'])
+        self.assertContains(response, f'{url}?cursor={cursor}')
+        response = self.client.get(url, {'cursor': cursor})
+        self.assertNotIn(last, response.context['posts'])
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertContains(response, 'подробная информация', count=5)
+
+    def test_last_page_without_cursor(self):
+        """На последней странице догружать нечего."""
+        response = self.client.get(
+            reverse('posts:profile', args=['author']), {'page': 2}
+        )
+        self.assertIsNone(response.context['feed_cursor'])
+        self.assertNotContains(response, 'more-posts')
+
+    def test_follow_feed_requires_login(self):
+        """Лента подписок доступна только авторизованным."""
+        response = Client().get(reverse('posts:follow_feed'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from ..garbage import collect_garbage
+from ..models import Post, StoredImage
+from ..storage import image_storage
+
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\x00\x00')
+
+
+def upload(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+class CollectGarbageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.kept = Post.objects.create(
+            author=self.author, text='Пост', image=upload('kept.gif')
+        )
+        self.dropped = Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=upload('dropped.gif', OTHER_GIF),
+        )
+        self.thumbnail = get_thumbnail(
+            self.dropped.image, '10x10', upscale=False
+        ).name
+        self.orphan = default.storage.save(
+            'cache/00/00/orphan.jpg', ContentFile(b'orphan')
+        )
+        self.dropped_name = self.dropped.image.name
+        self.dropped.delete()
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_unreferenced_files_are_deleted(self):
+        """Картинки без постов удаляются вместе с миниатюрами."""
+        report = collect_garbage(batch_size=1, min_age=0, workers=2)
+        self.assertFalse(self.exists(self.dropped_name))
+        self.assertFalse(self.exists(self.thumbnail))
+        self.assertFalse(self.exists(self.orphan))
+        self.assertTrue(self.exists(self.kept.image.name))
+        self.assertEqual(report.originals, 1)
+        self.assertEqual(report.thumbnails, 2)
+        source = ImageFile(self.dropped_name, image_storage)
+        self.assertIsNone(default.kvstore.get(source))
+        self.assertIsNone(
+            default.kvstore._get(source.key, identity='thumbnails')
+        )
+        self.assertFalse(
+            StoredImage.objects.filter(name=self.dropped_name).exists()
+        )
+
+    def test_refs_rechecked_by_posts(self):
+        """Строка с нулем ссылок не удаляет картинку живого поста."""
+        StoredImage.objects.filter(name=self.kept.image.name).update(refs=0)
+        report = collect_garbage(min_age=0)
+        self.assertTrue(self.exists(self.kept.image.name))
+        self.assertEqual(report.originals, 1)
+
+    def test_untracked_files_need_scan(self):
+        """Файлы без строки StoredImage находит только обход каталога."""
+        name = image_storage.save(
+            'posts/untracked.gif', ContentFile(b'untracked')
+        )
+        collect_garbage(min_age=0)
+        self.assertTrue(self.exists(name))
+        report = collect_garbage(min_age=0, scan=True)
+        self.assertFalse(self.exists(name))
+        self.assertEqual(report.originals, 1)
+
+    def test_fresh_files_are_kept(self):
+        """Свежие файлы не удаляются: их пост может еще сохраняться."""
+        report = collect_garbage(min_age=3600)
+        self.assertTrue(self.exists(self.dropped_name))
+        self.assertTrue(self.exists(self.orphan))
+        self.assertEqual(report.originals, 0)
+
+    def test_reupload_protects_old_file(self):
+        """Повторная загрузка старого файла делает его снова свежим."""
+        path = os.path.join(self.media_root, self.dropped_name)
+        old = time.time() - 7200
+        os.utime(path, (old, old))
+        name = image_storage.save('posts/again.gif', ContentFile(OTHER_GIF))
+        self.assertEqual(name, self.dropped_name)
+        report = collect_garbage(min_age=3600)
+        self.assertTrue(self.exists(self.dropped_name))
+        self.assertEqual(report.originals, 0)
+
+    def test_dry_run_deletes_nothing(self):
+        """Пробный запуск только показывает мусор."""
+        out = StringIO()
+        call_command(
+            'collect_media_garbage', '--dry-run', '--min-age=0', stdout=out
+        )
+        self.assertTrue(self.exists(self.dropped_name))
+        self.assertTrue(self.exists(self.thumbnail))
+        self.assertTrue(self.exists(self.orphan))
+        output = out.getvalue()
+        self.assertIn(self.dropped_name, output)
+        self.assertIn(self.orphan, output)
+        self.assertNotIn(self.kept.image.name, output)
+        self.assertIn('оригиналов 1', output)
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import shared_cache
+from core.templatetags.user_filters import elided_page_range
+
+from ..models import Post
+from ..utils import CountedPaginator
+
+User = get_user_model()
+
+
+class ElidedPageRangeTests(TestCase):
+    def page_range(self, num_pages, number):
+        paginator = CountedPaginator(range(num_pages), 1, count=num_pages)
+        return elided_page_range(paginator.page(number))
+
+    def test_short_feed(self):
+        """Короткая лента выводит все страницы без пропусков."""
+        self.assertEqual(self.page_range(1, 1), [1])
+        self.assertEqual(self.page_range(5, 3), [1, 2, 3, 4, 5])
+
+    def test_long_feed(self):
+        """В длинной ленте видны края и соседи текущей страницы."""
+        self.assertEqual(self.page_range(100, 1), [1, 2, 3, None, 100])
+        self.assertEqual(self.page_range(100, 4), [1, 2, 3, 4, 5, 6, None,
+                                                   100])
+        self.assertEqual(
+            self.page_range(100, 50), [1, None, 48, 49, 50, 51, 52, None, 100]
+        )
+        self.assertEqual(self.page_range(100, 97), [1, None, 95, 96, 97, 98,
+                                                    99, 100])
+
+    def test_single_gap_filled(self):
+        """Пропуск в одну страницу заменяется самой страницей."""
+        self.assertEqual(self.page_range(100, 5), [1, 2, 3, 4, 5, 6, 7, None,
+                                                   100])
+
+
+class PaginatorTemplateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}') for number in range(11)
+        )
+
+    def test_response_size_bounded(self):
+        """Навигация по огромной ленте содержит ограниченное число ссылок."""
+        cache.clear()
+        shared_cache().set('feed_count:index', 10 ** 6)
+        self.addCleanup(shared_cache().clear)
+        response = Client().get(reverse('posts:posts_index'))
+        self.assertContains(response, '?page=100000"', count=2)
+        self.assertLess(response.content.count(b'class="page-item'), 12)
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..placeholders import EXIF_ORIENTATION
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(name, size, orientation=None):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    Image.new('RGB', size, (10, 120, 200)).save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImagePlaceholderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_preview_computed_on_upload(self):
+        """При загрузке картинки сохраняются размеры и превью."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload('a.jpg', (300, 200))
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (300, 200))
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/png;base64,')
+        )
+        self.assertLess(len(post.image_placeholder), 1000)
+
+    def test_rotated_dimensions(self):
+        """Размеры учитывают поворот по EXIF."""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=upload('b.jpg', (300, 200), orientation=6),
+        )
+        self.assertEqual((post.image_width, post.image_height), (200, 300))
+
+    def test_preview_follows_image(self):
+        """Превью обновляется при замене картинки и не читается зря."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload('c.jpg', (300, 200))
+        )
+        post.image = upload('d.jpg', (120, 80))
+        post.save()
+        self.assertEqual((post.image_width, post.image_height), (120, 80))
+        post = Post.objects.get(pk=post.pk)
+        post.image_placeholder = 'kept'
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(post.image_placeholder, 'kept')
+        post.image = None
+        post.save()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_placeholder, '')
+
+    def test_feed_reserves_space(self):
+        """Карточка поста выводит размеры и превью."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload('e.jpg', (300, 200))
+        )
+        response = Client().get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, post.image_placeholder)
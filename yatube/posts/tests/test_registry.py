@@ -0,0 +1,97 @@
+import warnings
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
+from django.http import Http404
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group
+from ..registry import authors, groups
+
+User = get_user_model()
+
+
+class RegistryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+
+    def setUp(self):
+        cache.clear()
+        groups.local.clear()
+        authors.local.clear()
+
+    def test_lookup_cached(self):
+        """Повторный поиск не ходит в базу, в том числе из другого процесса."""
+        with self.assertNumQueries(2):
+            groups.get('group')
+            authors.get('author')
+        with self.assertNumQueries(0):
+            group = groups.get('group')
+        groups.local.clear()
+        with self.assertNumQueries(0):
+            author = authors.get('author')
+            self.assertEqual(author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(group, self.group)
+        self.assertEqual(group.description, 'Описание')
+
+    def test_missing(self):
+        """Несуществующий slug дает 404 и не кэшируется."""
+        with self.assertRaises(Http404):
+            groups.get_or_404('missing')
+        Group.objects.create(title='Новая', slug='missing')
+        self.assertIsNotNone(groups.get('missing'))
+
+    def test_unsafe_values_in_keys(self):
+        """Кириллица и пробелы не попадают в ключ кэша как есть."""
+        user = User.objects.create_user(username='Лев Толстой')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            self.assertEqual(authors.get('Лев Толстой'), user)
+            self.assertIsNone(groups.get('группа'))
+
+    def test_invalidated_on_change(self):
+        """Переименование и удаление сбрасывают снимки."""
+        groups.get('group')
+        self.group.slug = 'renamed'
+        self.group.title = 'Другая'
+        self.group.save()
+        self.assertIsNone(groups.get('group'))
+        self.assertEqual(groups.get('renamed').title, 'Другая')
+        User.objects.create_user(username='leaving')
+        authors.get('leaving').delete()
+        self.assertIsNone(authors.get('leaving'))
+
+    def test_rename_without_select(self):
+        """Сохранение пользователя не перечитывает старое имя из базы."""
+        user = User.objects.create_user(username='before')
+        authors.get('before')
+        user = User.objects.get(pk=user.pk)
+        user.username = 'after'
+        with self.assertNumQueries(1):
+            user.save()
+        self.assertIsNone(authors.get('before'))
+        self.assertEqual(authors.get('after'), user)
+
+    def test_pages_use_registry(self):
+        """Страницы группы, профиля и подписки находят объект по снимку."""
+        client = Client()
+        follower = User.objects.create_user(username='follower')
+        client.force_login(follower)
+        response = client.get(reverse('posts:group_list', args=['group']))
+        self.assertEqual(response.context['group'], self.group)
+        response = client.get(reverse('posts:profile', args=['author']))
+        self.assertEqual(response.context['author'], self.author)
+        client.get(reverse('posts:profile_follow', args=['author']))
+        self.assertTrue(
+            Follow.objects.filter(user=follower, author=self.author).exists()
+        )
+        response = client.get(reverse('posts:profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
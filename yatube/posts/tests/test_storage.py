@@ -0,0 +1,145 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from ..models import Post, StoredImage
+from ..storage import image_storage, is_sharded
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\x00\x00')
+
+
+def upload(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_duplicates_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом."""
+        first = Post.objects.create(
+            author=self.author, text='Пост', image=upload('meme.gif')
+        )
+        second = Post.objects.create(
+            author=self.author, text='Пост', image=upload('copy.GIF')
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertTrue(is_sharded(first.image.name))
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1
+        )
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).refs, 2
+        )
+
+    def test_refs_follow_edit_and_delete(self):
+        """Замена картинки и удаление поста уменьшают число ссылок."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload('meme.gif')
+        )
+        old_name = post.image.name
+        client = Client()
+        client.force_login(self.author)
+        client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            data={
+                'text': 'Новый текст',
+                'image': upload('new.gif', OTHER_GIF),
+            },
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(StoredImage.objects.get(name=old_name).refs, 0)
+        self.assertEqual(StoredImage.objects.get(name=post.image.name).refs, 1)
+
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(StoredImage.objects.get(name=post.image.name).refs, 0)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ShardMediaCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_flat_files_are_moved(self):
+        """Команда переносит плоские файлы и переписывает Post.image."""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        for name, content in (('a.gif', SMALL_GIF), ('b.gif', SMALL_GIF)):
+            with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', name), 'wb') as f:
+                f.write(content)
+            Post.objects.create(
+                author=self.author, text='Пост', image=f'posts/{name}'
+            )
+
+        call_command('shard_media', batch_size=1, stdout=StringIO())
+
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_sharded(name))
+        self.assertTrue(os.path.isfile(os.path.join(TEMP_MEDIA_ROOT, name)))
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.gif'))
+        )
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 2)
+        self.assertFalse(
+            StoredImage.objects.filter(name='posts/a.gif').exists()
+        )
+
+    def test_old_thumbnails_are_deleted(self):
+        """Миниатюры и записи sorl старого имени удаляются при переносе."""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'c.gif'), 'wb') as f:
+            f.write(OTHER_GIF)
+        post = Post.objects.create(
+            author=self.author, text='Пост', image='posts/c.gif'
+        )
+        thumbnail = get_thumbnail(post.image, '10x10', upscale=False).name
+
+        call_command('shard_media', stdout=StringIO())
+
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, thumbnail))
+        )
+        source = ImageFile('posts/c.gif', image_storage)
+        self.assertIsNone(default.kvstore.get(source))
+        self.assertIsNone(
+            default.kvstore._get(source.key, identity='thumbnails')
+        )
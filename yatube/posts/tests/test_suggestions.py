@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, FollowSuggestion, Group, Post, StaleSuggestions
+from ..suggestions import update_suggestions
+
+User = get_user_model()
+
+
+class FollowSuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.friend = User.objects.create_user(username='friend')
+        cls.friend_of_friend = User.objects.create_user(username='fof')
+        cls.neighbour = User.objects.create_user(username='neighbour')
+        group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.friend, text='Пост', group=group)
+        Post.objects.create(author=cls.neighbour, text='Пост', group=group)
+
+    def test_follow_marks_neighbourhood_stale(self):
+        """Подписка помечает пользователя и его подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.friend_of_friend)
+        self.assertEqual(
+            set(StaleSuggestions.objects.values_list('user_id', flat=True)),
+            {self.reader.id, self.friend.id},
+        )
+
+    def test_new_group_marks_neighbourhood_stale(self):
+        """Пост автора в новой для него группе помечает соседей."""
+        group = Group.objects.create(title='Новая', slug='new')
+        Post.objects.create(
+            author=self.friend_of_friend, text='Пост', group=group
+        )
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(
+            user=self.neighbour, author=self.friend_of_friend
+        )
+        StaleSuggestions.objects.all().delete()
+
+        post = Post.objects.create(
+            author=self.friend, text='Пост', group=group
+        )
+        self.assertEqual(
+            set(StaleSuggestions.objects.values_list('user_id', flat=True)),
+            {self.reader.id, self.neighbour.id},
+        )
+        StaleSuggestions.objects.all().delete()
+        Post.objects.create(author=self.friend, text='Еще', group=group)
+        post.delete()
+        self.assertFalse(StaleSuggestions.objects.exists())
+
+    def test_suggestions_from_graph(self):
+        """Рекомендуются авторы второго круга и соседи по группам."""
+        Follow.objects.create(user=self.reader, author=self.friend)
+        Follow.objects.create(user=self.friend, author=self.friend_of_friend)
+
+        self.assertEqual(update_suggestions(), 2)
+        self.assertFalse(StaleSuggestions.objects.exists())
+        authors = list(
+            FollowSuggestion.objects.filter(user=self.reader)
+            .values_list('author__username', flat=True)
+        )
+        self.assertEqual(authors, ['fof', 'neighbour'])
+        self.assertEqual(update_suggestions(), 0)
+
+    def test_follow_index_shows_suggestions(self):
+        """Страница подписок выводит рекомендации из таблицы."""
+        FollowSuggestion.objects.create(
+            user=self.reader, author=self.neighbour, score=1
+        )
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            response.context['suggestions'][0].author, self.neighbour
+        )
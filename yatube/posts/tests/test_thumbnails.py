@@ -0,0 +1,83 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from ..models import Post
+from ..thumbnails import FEED_GEOMETRY, FEED_OPTIONS, attach_thumbnails
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(name, color):
+    """Картинка размером с миниатюру ленты."""
+    buffer = BytesIO()
+    Image.new('RGB', (960, 339), color).save(buffer, 'GIF')
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class AttachThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                image=upload(f'{number}.gif', (number * 40, 0, 0)),
+            )
+            for number in range(3)
+        ]
+        cls.plain = Post.objects.create(author=cls.author, text='Без')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matches_sorl(self):
+        """Миниатюры совпадают с теми, что строит sorl."""
+        attach_thumbnails(self.posts + [self.plain])
+        for post in self.posts:
+            expected = get_thumbnail(
+                post.image, FEED_GEOMETRY, **FEED_OPTIONS
+            )
+            self.assertEqual(post.thumbnail.name, expected.name)
+            self.assertEqual(list(post.thumbnail.size), [960, 339])
+        self.assertIsNone(self.plain.thumbnail)
+
+    def test_one_lookup_for_page(self):
+        """Готовые миниатюры страницы ищутся одним запросом."""
+        attach_thumbnails(self.posts)
+        cache.clear()
+        posts = list(Post.objects.filter(image__startswith='posts/'))
+        with self.assertNumQueries(1):
+            attach_thumbnails(posts)
+        with self.assertNumQueries(0):
+            attach_thumbnails(posts)
+        self.assertTrue(all(post.thumbnail for post in posts))
+
+    def test_feed_uses_precomputed_thumbnails(self):
+        """Лента выводит миниатюры, подготовленные во вью."""
+        response = Client().get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        for post in response.context['page_obj']:
+            if post.image:
+                self.assertContains(response, post.thumbnail.url)
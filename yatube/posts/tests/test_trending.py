@@ -0,0 +1,106 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..counters import ViewCounter
+from ..models import (
+    Comment, Follow, Group, Post, PostViewDelta, TrendingGroup, TrendingPost,
+    TrendingRun,
+)
+from ..trending import COMMENT_WEIGHT, update_trending
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='slug',
+            description='Тестовое описание',
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.author, text='Горячий пост', group=cls.group
+        )
+        cls.cold_post = Post.objects.create(
+            author=cls.author, text='Холодный пост'
+        )
+
+    def test_scores_decay_and_accumulate(self):
+        """Рейтинг растет от событий и затухает со временем."""
+        Comment.objects.create(
+            author=self.reader, post=self.hot_post, text='Комментарий'
+        )
+        counter = ViewCounter()
+        counter._flusher = True
+        for _ in range(10):
+            counter.hit(self.cold_post.pk)
+        counter.flush()
+        now = timezone.now()
+        update_trending(now)
+
+        hot = TrendingPost.objects.get(post=self.hot_post)
+        cold = TrendingPost.objects.get(post=self.cold_post)
+        self.assertEqual(hot.score, COMMENT_WEIGHT)
+        self.assertFalse(PostViewDelta.objects.exists())
+        self.assertEqual(
+            TrendingGroup.objects.get(group=self.group).score, hot.score
+        )
+
+        update_trending(now + timedelta(hours=6))
+        hot.refresh_from_db()
+        cold.refresh_from_db()
+        self.assertAlmostEqual(hot.score, COMMENT_WEIGHT / 2)
+        self.assertAlmostEqual(cold.score, 0.5)
+
+    def test_faded_posts_pruned(self):
+        """Затухшие посты удаляются, события не учитываются дважды."""
+        Comment.objects.create(
+            author=self.reader, post=self.hot_post, text='Комментарий'
+        )
+        now = timezone.now()
+        update_trending(now)
+        update_trending(now + timedelta(days=3))
+        self.assertFalse(TrendingPost.objects.exists())
+        update_trending(now + timedelta(days=3, hours=1))
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_follow_lifts_fresh_posts(self):
+        """Новые подписки на автора поднимают его свежие посты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        call_command('update_trending', stdout=StringIO())
+        self.assertEqual(TrendingPost.objects.count(), 2)
+
+    def test_first_run_skips_migrated_follows(self):
+        """Подписки, существовавшие до миграций, не считаются новыми."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TrendingRun.objects.all().delete()
+        migration = import_module('posts.migrations.0023_seed_trending_run')
+        migration.seed_run(apps, None)
+        update_trending(timezone.now() + timedelta(seconds=1))
+        self.assertFalse(TrendingPost.objects.exists())
+
+    def test_trending_page(self):
+        """Страница популярного выводит посты по убыванию рейтинга."""
+        now = timezone.now()
+        TrendingPost.objects.create(post=self.cold_post, score=1, updated=now)
+        TrendingPost.objects.create(post=self.hot_post, score=5, updated=now)
+        TrendingGroup.objects.create(group=self.group, score=5)
+
+        response = Client().get(reverse('posts:trending'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.hot_post, self.cold_post],
+        )
+        self.assertEqual(response.context['groups'][0].group, self.group)
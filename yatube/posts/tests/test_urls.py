@@ -4,6 +4,8 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.test import Client, TestCase
 
+from core.cache import shared_cache
+
 from ..models import Group, Post
 
 User = get_user_model()
@@ -34,6 +36,7 @@ class TaskURLTests(TestCase):
 
     def setUp(self):
         cache.clear()
+        shared_cache().clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='user')
         self.user_client = Client()
@@ -9,6 +9,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.cache import shared_cache
+
 from ..forms import PostForm
 from ..models import Follow, Group, Post
 
@@ -48,6 +50,7 @@ class PostsPagesTests(TestCase):
 
     def setUp(self):
         cache.clear()
+        shared_cache().clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.author)
 
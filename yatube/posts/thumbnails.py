@@ -0,0 +1,103 @@
+import logging
+from collections import defaultdict
+
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE, KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def thumbnail_options(source, options):
+    """Опции миниатюры с умолчаниями, как их дополняет бэкенд sorl."""
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def get_many_raw(keys):
+    """
+    Значения key-value хранилища sorl по списку ключей.
+    Для хранилища в кэше и базе это один get_many к кэшу и
+    один запрос к базе за ключами, которых в кэше не было.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        stored = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        kvstore.cache.set_many(
+            {key: stored.get(key, EMPTY_VALUE) for key in missing},
+            thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT,
+        )
+        found.update(stored)
+    return {
+        key: value for key, value in found.items() if value != EMPTY_VALUE
+    }
+
+
+def create_thumbnail(image, geometry, options):
+    """Миниатюра через sorl или None, если ее не удалось построить."""
+    try:
+        thumbnail = default.backend.get_thumbnail(image, geometry, **options)
+    except Exception:
+        if thumbnail_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Thumbnail for %s failed', image)
+        return None
+    return thumbnail if thumbnail.size else None
+
+
+def attach_thumbnails(
+    posts, geometry=FEED_GEOMETRY, options=FEED_OPTIONS, attr='thumbnail'
+):
+    """
+    Записывает в атрибут attr каждого поста миниатюру его картинки.
+    Миниатюры всех постов ищутся в хранилище sorl одним заходом,
+    sorl вызывается только для миниатюр, которых еще нет. У постов
+    без картинки, с потерянным файлом или с ошибкой миниатюры
+    атрибут равен None.
+    """
+    pending = defaultdict(list)
+    for post in posts:
+        setattr(post, attr, None)
+        if not post.image:
+            continue
+        source = ImageFile(post.image)
+        name = default.backend._get_thumbnail_filename(
+            source, geometry, thumbnail_options(source, options)
+        )
+        key = add_prefix(ImageFile(name, default.storage).key)
+        pending[key].append(post)
+    if not pending:
+        return
+    found = get_many_raw(list(pending))
+    for key, waiting in pending.items():
+        if key in found:
+            thumbnail = deserialize_image_file(found[key])
+        else:
+            thumbnail = create_thumbnail(waiting[0].image, geometry, options)
+        if thumbnail is None:
+            continue
+        for post in waiting:
+            setattr(post, attr, thumbnail)
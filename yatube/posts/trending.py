@@ -0,0 +1,124 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from .models import (
+    Comment, Follow, Post, PostViewDelta, TrendingGroup, TrendingPost,
+    TrendingRun,
+)
+
+COMMENT_WEIGHT = 3.0
+VIEW_WEIGHT = 0.1
+FOLLOW_WEIGHT = 1.0
+
+
+def _comment_gains(since, now, gains):
+    comments = (
+        Comment.objects
+        .filter(created__gt=since, created__lte=now)
+        .order_by()
+        .values_list('post')
+        .annotate(total=Count('id'))
+    )
+    for post_id, total in comments:
+        gains[post_id] += COMMENT_WEIGHT * total
+
+
+def _view_gains(gains):
+    """Прирост просмотров из сбросов счетчика с прошлого пересчета."""
+    deltas = PostViewDelta.objects.all()
+    last = deltas.aggregate(last=Max('id'))['last']
+    if last is None:
+        return
+    deltas = deltas.filter(id__lte=last)
+    views = deltas.order_by().values_list('post').annotate(total=Sum('views'))
+    for post_id, total in views:
+        gains[post_id] += VIEW_WEIGHT * total
+    deltas.delete()
+
+
+def _follow_gains(since, now, gains):
+    """Новые подписчики автора поднимают его свежие посты."""
+    follows = dict(
+        Follow.objects
+        .filter(created__gt=since, created__lte=now)
+        .order_by()
+        .values_list('author')
+        .annotate(total=Count('id'))
+    )
+    if not follows:
+        return
+    fresh = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    posts = Post.objects.filter(
+        author__in=follows, pub_date__gte=fresh
+    ).values_list('id', 'author')
+    for post_id, author_id in posts:
+        gains[post_id] += FOLLOW_WEIGHT * follows[author_id]
+
+
+def update_trending(now=None):
+    """
+    Пересчитывает таблицы популярных постов и групп.
+    Накопленный рейтинг затухает вдвое за TRENDING_HALF_LIFE секунд,
+    к нему добавляются события, случившиеся с прошлого пересчета.
+    Посты, чей рейтинг затух ниже TRENDING_PRUNE_SCORE, удаляются
+    из таблицы, поэтому пересчет обходит только недавнюю активность.
+    Возвращает количество постов, получивших новые события.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        run = TrendingRun.objects.select_for_update().first()
+        if run is None:
+            since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+            run = TrendingRun(updated=now)
+        else:
+            since, run.updated = run.updated, now
+        run.save()
+        elapsed = (now - since).total_seconds()
+        decay = 0.5 ** (elapsed / settings.TRENDING_HALF_LIFE)
+
+        gains = Counter()
+        _comment_gains(since, now, gains)
+        _view_gains(gains)
+        _follow_gains(since, now, gains)
+
+        faded = TrendingPost.objects.all()
+        if decay:
+            faded = faded.filter(
+                score__lt=settings.TRENDING_PRUNE_SCORE / decay
+            )
+        faded.delete()
+        TrendingPost.objects.update(score=F('score') * decay, updated=now)
+        existing = TrendingPost.objects.in_bulk(list(gains))
+        changed, created = [], []
+        for post_id, gain in gains.items():
+            row = existing.get(post_id)
+            if row is None:
+                row = TrendingPost(post_id=post_id, score=0, updated=now)
+                created.append(row)
+            else:
+                changed.append(row)
+            row.score += gain
+        TrendingPost.objects.bulk_update(changed, ['score'])
+        TrendingPost.objects.bulk_create(created)
+
+        groups = (
+            TrendingPost.objects
+            .filter(
+                score__gte=settings.TRENDING_MIN_SCORE,
+                post__group__isnull=False,
+            )
+            .order_by()
+            .values_list('post__group')
+            .annotate(total=Sum('score'))
+        )
+        TrendingGroup.objects.all().delete()
+        TrendingGroup.objects.bulk_create(
+            TrendingGroup(group_id=group_id, score=total)
+            for group_id, total in groups
+        )
+    return len(gains)
@@ -1,6 +1,131 @@
+from datetime import datetime, timedelta
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Follow
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class CountedPaginator(Paginator):
+    """
+    Пагинатор с заранее посчитанным числом записей, без COUNT(*).
+    Счетчик может отставать или быть оценкой (approximate), поэтому
+    страница выбирается с одной лишней записью: по ней видно, есть ли
+    следующая, а последняя страница уточняет общее число.
+    """
+
+    def __init__(self, object_list, per_page, count=None,
+                 approximate=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.__dict__['count'] = count
+        self.approximate = approximate
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть числом')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage('На этой странице нет записей')
+        if len(items) <= self.per_page:
+            self._set_count(bottom + len(items), approximate=False)
+        elif self.count <= bottom + self.per_page:
+            self._set_count(bottom + len(items), approximate=True)
+        return self._get_page(items[:self.per_page], number, self)
+
+    def _set_count(self, count, approximate):
+        self.__dict__['count'] = count
+        self.__dict__.pop('num_pages', None)
+        self.approximate = approximate
+
+    def get_page(self, number):
+        try:
+            number = self.validate_number(number)
+        except (PageNotAnInteger, EmptyPage):
+            number = 1
+        try:
+            return self.page(number)
+        except EmptyPage:
+            # Счетчик завышен: страница оказалась за концом ленты.
+            self._set_count(self.object_list.count(), approximate=False)
+            return self.page(self.num_pages)
+
+
+def paginator(data, count=None, approximate=False):
+    if count is None:
+        return Paginator(data, settings.POSTS_AMOUNT_ON_PAGE)
+    return CountedPaginator(
+        data, settings.POSTS_AMOUNT_ON_PAGE, count, approximate
+    )
+
+
+def encode_cursor(moment, pk):
+    """Курсор из даты и id последней выведенной записи."""
+    return f'{(moment - EPOCH) // MICROSECOND}_{pk}'
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор, для некорректного курсора возвращает None."""
+    try:
+        micros, pk = cursor.split('_')
+        return EPOCH + int(micros) * MICROSECOND, int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def page_cursor(page):
+    """Курсор для догрузки постов после страницы или None на последней."""
+    if not page.has_next():
+        return None
+    last = page[len(page) - 1]
+    return encode_cursor(last.pub_date, last.pk)
+
+
+def cursor_page(queryset, cursor, field, amount):
+    """
+    Страница записей от новых к старым после курсора.
+    Записи упорядочиваются по (field, id), поэтому выборка идет
+    по индексу без OFFSET. Возвращает список записей и курсор
+    следующей страницы или None, если страница последняя.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        moment, pk = position
+        queryset = queryset.filter(
+            Q(**{f'{field}__lt': moment}) | Q(**{field: moment, 'id__lt': pk})
+        )
+    items = list(queryset[:amount + 1])
+    if len(items) <= amount:
+        return items, None
+    items = items[:amount]
+    last = items[-1]
+    return items, encode_cursor(getattr(last, field), last.pk)
 
 
-def paginator(data):
-    return Paginator(data, settings.POSTS_AMOUNT_ON_PAGE)
+def follow_state(user):
+    """
+    Авторы, на которых подписан пользователь, для состояния дыр
+    кэша страниц. id строками, как приходят аргументы дыр.
+    """
+    return {
+        'following': [
+            str(author_id) for author_id in Follow.objects.filter(
+                user=user
+            ).values_list('author_id', flat=True)
+        ]
+    }
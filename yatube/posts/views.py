@@ -1,16 +1,30 @@
-from django.contrib.auth import get_user_model
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber, Substr
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
 
-from .forms import PostForm, CommentForm
-from .models import Group, Post, Comment, Follow
-from .utils import paginator
+from core.pagecache import cache_page_with_holes
+from core.writer import run_write
 
-User = get_user_model()
+from .counters import feed_count, follow_count, view_counter
+from .forms import PostForm, CommentForm
+from .models import (
+    COMMENT_SEGMENT_WIDTH,
+    Post,
+    Comment,
+    Follow,
+    FollowSuggestion,
+    TrendingGroup,
+)
+from .registry import authors, groups
+from .thumbnails import attach_thumbnails
+from .utils import cursor_page, page_cursor, paginator
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_page_with_holes(key_prefix='index')
 def index(request):
     """
     Вью функция отвечающая за вывод постов на главной странице,
@@ -18,69 +32,306 @@ def index(request):
     """
     post_list = Post.objects.select_related()
     page_number = request.GET.get('page')
-    page_obj = paginator(post_list).get_page(page_number)
+    page_obj = paginator(post_list, *feed_count('index')).get_page(
+        page_number
+    )
+    attach_thumbnails(page_obj)
 
     context = {
         'page_obj': page_obj,
+        'feed_cursor': page_cursor(page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
+def feed_fragment(request, posts):
+    """
+    Посты ленты после курсора без остальной страницы, для догрузки
+    при прокрутке. Выборка идет по индексу (pub_date, id) без OFFSET,
+    курсор следующей порции передается в заголовке X-Next-Cursor.
+    """
+    posts, cursor = cursor_page(
+        posts,
+        request.GET.get('cursor'),
+        'pub_date',
+        settings.POSTS_AMOUNT_ON_PAGE,
+    )
+    attach_thumbnails(posts)
+    response = render(request, 'posts/includes/feed.html', {'posts': posts})
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+    return response
+
+
+def index_feed(request):
+    return feed_fragment(request, Post.objects.select_related())
+
+
 def group_posts(request, slug):
     """
     Вью функция отвечающая за вывод постов на странице группы,
     пагинируется, сортируется от новых к старым и по принадлежности
     к группе, 10 постов на страницу.
     """
-    group = get_object_or_404(Group, slug=slug)
+    group = groups.get_or_404(slug)
     posts = group.group_posts.select_related()
     page_number = request.GET.get('page')
-    page_obj = paginator(posts).get_page(page_number)
+    page_obj = paginator(posts, *feed_count(f'group:{group.pk}')).get_page(
+        page_number
+    )
+    attach_thumbnails(page_obj)
     context = {
         'page_obj': page_obj,
+        'feed_cursor': page_cursor(page_obj),
         'group': group,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+def group_feed(request, slug):
+    group = groups.get_or_404(slug)
+    return feed_fragment(request, group.group_posts.select_related())
+
+
 def profile(request, username):
     """
     Вью функция отвечающая за вывод постов на странице пользователя,
     пагинируется, сортируется от новых к старым и по принадлежности
     к пользователю, 10 постов на страницу.
-    Переменная following отвечает за значение кнопки подписки/отписки
-    от автора.
+    Кнопка подписки/отписки зависит от пользователя и выводится
+    дырой, HTML которой берется из кэша по состоянию пользователя.
     """
-    author = get_object_or_404(User, username=username)
-    following = request.user.is_authenticated and author.following.exists()
-
+    author = authors.get_or_404(username)
     posts = author.posts.all()
     page_number = request.GET.get('page')
-    page_obj = paginator(posts).get_page(page_number)
+    page_obj = paginator(posts, *feed_count(f'author:{author.pk}')).get_page(
+        page_number
+    )
+    attach_thumbnails(page_obj)
     context = {
         'author': author,
         'page_obj': page_obj,
-        'following': following
+        'feed_cursor': page_cursor(page_obj),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_feed(request, username):
+    author = authors.get_or_404(username)
+    return feed_fragment(request, author.posts.all())
+
+
 def post_detail(request, post_id):
     """
     Вью функция отвечающая за вывод одного поста
-    на страницу детального прсомотра, по id
+    на страницу детального прсомотра, по id.
+    Параметры cursor и thread открывают следующую страницу
+    комментариев или ветку целиком без JS.
     """
     post = get_object_or_404(Post, id=post_id)
-    comment = Comment.objects.filter(post_id=post_id)
+    view_counter.hit(post.id)
+    cursor = request.GET.get('cursor')
+    thread = request.GET.get('thread')
+    if thread and thread.isdigit():
+        root = get_object_or_404(Comment, post_id=post_id, id=thread)
+        comments, cursor = thread_page(
+            post_id, root.path, cursor,
+            settings.COMMENT_THREAD_AMOUNT_ON_PAGE,
+        )
+        comments_url = reverse('posts:comment_thread', args=(post_id, root.id))
+        comments_query = f'thread={root.id}&'
+    else:
+        comments, cursor = comments_page(post_id, cursor)
+        comments_url = reverse('posts:post_comments', args=(post_id,))
+        comments_query = ''
     form = CommentForm(request.POST or None)
+    reply_to = request.GET.get('reply_to')
+    if reply_to and reply_to.isdigit():
+        reply_to = Comment.objects.filter(
+            post_id=post_id, id=reply_to
+        ).select_related('author').first()
+    else:
+        reply_to = None
     context = {
         'post': post,
-        'comments': comment,
-        'form': form
+        'comments': comments,
+        'comments_cursor': cursor,
+        'comments_url': comments_url,
+        'comments_query': comments_query,
+        'form': form,
+        'reply_to': reply_to,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def thread_range(post_id, first_path, last_path):
+    """
+    Комментарии веток от first_path до last_path включительно
+    в порядке вывода. Пути ветки начинаются с пути ее корня,
+    поэтому это один диапазон по индексу (post, path).
+    """
+    return Comment.objects.filter(
+        post_id=post_id,
+        path__gte=first_path,
+        path__lt=last_path + '~',
+    ).select_related('author').order_by('path')
+
+
+def thread_page(post_id, root_path, cursor, amount):
+    """
+    Часть ветки после пути cursor в порядке вывода, не больше amount
+    комментариев. Курсор следующей части - путь последнего из них.
+    """
+    comments = thread_range(post_id, root_path, root_path)
+    if cursor:
+        comments = comments.filter(path__gt=cursor)
+    comments = list(comments[:amount + 1])
+    if len(comments) <= amount:
+        return comments, None
+    comments = comments[:amount]
+    return comments, comments[-1].path
+
+
+def comments_page(post_id, cursor):
+    """
+    Страница корневых комментариев поста, от новых к старым.
+    Под каждым корнем выводятся первые COMMENT_REPLIES_PREVIEW
+    ответов ветки, остальные доступны по ссылке на ветку, поэтому
+    большая ветка не раздувает страницу.
+    """
+    roots, cursor = cursor_page(
+        Comment.objects.filter(post_id=post_id, parent__isnull=True)
+        .select_related('author'),
+        cursor,
+        'created',
+        settings.COMMENTS_AMOUNT_ON_PAGE,
+    )
+    previews = reply_previews(
+        post_id, roots, settings.COMMENT_REPLIES_PREVIEW
+    )
+    comments = []
+    for root in roots:
+        comments.append(root)
+        comments += previews.get(root.path, [])
+    return comments, cursor
+
+
+def reply_previews(post_id, roots, amount):
+    """
+    Первые amount ответов каждой из веток roots одним запросом.
+    Номер ответа в ветке считает оконная функция по пути корня,
+    поэтому большая ветка отдает не больше amount строк.
+    """
+    ranges = Q()
+    for root in roots:
+        if root.reply_count:
+            ranges |= Q(path__gt=root.path, path__lt=root.path + '~')
+    if not ranges:
+        return {}
+    numbered = Comment.objects.filter(ranges, post_id=post_id).annotate(
+        number=Window(
+            RowNumber(),
+            partition_by=[Substr('path', 1, COMMENT_SEGMENT_WIDTH)],
+            order_by=F('path').asc(),
+        )
+    ).values('id', 'number').order_by()
+    sql, params = numbered.query.sql_with_params()
+    # IN с выражением оборачивается во вторые скобки, и SQLite
+    # считает такой подзапрос скалярным, поэтому условие через extra.
+    replies = Comment.objects.extra(
+        where=[
+            f'"posts_comment"."id" IN '
+            f'(SELECT id FROM ({sql}) AS numbered WHERE number <= %s)'
+        ],
+        params=(*params, amount),
+    ).select_related('author').order_by('path')
+    previews = {}
+    for reply in replies:
+        previews.setdefault(
+            reply.path[:COMMENT_SEGMENT_WIDTH], []
+        ).append(reply)
+    return previews
+
+
+def comments_response(request, comments, cursor=None):
+    if request.GET.get('format') == 'json':
+        response = JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'parent': comment.parent_id,
+                    'depth': comment.depth,
+                    'reply_count': comment.reply_count,
+                    'text': comment.text,
+                    'created': comment.created,
+                    'author': {
+                        'username': comment.author.username,
+                        'full_name': comment.author.get_full_name(),
+                    },
+                }
+                for comment in comments
+            ],
+            'next_cursor': cursor,
+        })
+    else:
+        response = render(
+            request, 'posts/includes/comments.html', {'comments': comments}
+        )
+    if cursor:
+        response['X-Next-Cursor'] = cursor
+    return response
+
+
+def post_comments(request, post_id):
+    """
+    Вью функция отдающая следующую страницу комментариев поста
+    после курсора: HTML фрагментом или JSON при format=json.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    """
+    comments, cursor = comments_page(post_id, request.GET.get('cursor'))
+    return comments_response(request, comments, cursor)
+
+
+def comment_thread(request, post_id, comment_id):
+    """
+    Вью функция отдающая ветку ответов на комментарий
+    вместе с самим комментарием, частями по
+    COMMENT_THREAD_AMOUNT_ON_PAGE. Курсор следующей части
+    передается в заголовке X-Next-Cursor.
+    """
+    root = get_object_or_404(Comment, post_id=post_id, id=comment_id)
+    comments, cursor = thread_page(
+        post_id, root.path, request.GET.get('cursor'),
+        settings.COMMENT_THREAD_AMOUNT_ON_PAGE,
+    )
+    return comments_response(request, comments, cursor)
+
+
+def trending(request):
+    """
+    Вью функция отвечающая за вывод популярных постов и групп.
+    Читает материализованные рейтинги, которые пересчитывает
+    команда update_trending.
+    """
+    post_list = (
+        Post.objects
+        .filter(trending__score__gte=settings.TRENDING_MIN_SCORE)
+        .select_related('author', 'group')
+        .order_by('-trending__score')
+    )
+    page_number = request.GET.get('page')
+    page_obj = paginator(post_list).get_page(page_number)
+    attach_thumbnails(page_obj)
+    groups = TrendingGroup.objects.select_related('group')[
+        :settings.TRENDING_GROUPS_AMOUNT
+    ]
+    context = {
+        'page_obj': page_obj,
+        'groups': groups,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 @login_required()
 def post_create(request):
     """
@@ -129,7 +380,12 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        parent_id = request.POST.get('parent')
+        if parent_id and parent_id.isdigit():
+            comment.parent = Comment.objects.filter(
+                post=post, id=parent_id
+            ).first()
+        run_write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -137,26 +393,43 @@ def add_comment(request, post_id):
 def follow_index(request):
     post_list = Post.objects.filter(author__following__user=request.user)
     page_number = request.GET.get('page')
-    page_obj = paginator(post_list).get_page(page_number)
+    page_obj = paginator(post_list, follow_count(request.user.pk)).get_page(
+        page_number
+    )
+    attach_thumbnails(page_obj)
+    suggestions = FollowSuggestion.objects.filter(
+        user=request.user
+    ).select_related('author')[:settings.FOLLOW_SUGGESTIONS_AMOUNT]
 
     context = {
         'page_obj': page_obj,
+        'feed_cursor': page_cursor(page_obj),
+        'suggestions': suggestions,
     }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def follow_feed(request):
+    return feed_fragment(
+        request, Post.objects.filter(author__following__user=request.user)
+    )
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     user = request.user
     if author != user:
-        Follow.objects.get_or_create(user=user, author=author)
+        run_write(
+            lambda: Follow.objects.get_or_create(user=user, author=author)
+        )
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = authors.get_or_404(username)
     obj = Follow.objects.filter(user=request.user, author=author)
     obj.delete()
 
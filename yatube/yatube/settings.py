@@ -35,7 +35,10 @@ ALLOWED_HOSTS = [
 
 # Application definition
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма ставятся в очередь, отправляет их команда send_outbox
+# через OUTBOX_EMAIL_BACKEND.
+EMAIL_BACKEND = 'core.mail.OutboxEmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 INSTALLED_APPS = [
@@ -54,10 +57,11 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -139,17 +143,128 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+# collectstatic добавляет хэши в имена файлов и кладет рядом .gz и .br
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 # castom settings
 
 POSTS_AMOUNT_ON_PAGE = 10
+COMMENTS_AMOUNT_ON_PAGE = 20
+# Ответов под каждым корневым комментарием на странице поста
+# и комментариев ветки на одну порцию догрузки.
+COMMENT_REPLIES_PREVIEW = 3
+COMMENT_THREAD_AMOUNT_ON_PAGE = 50
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Передача медиафайлов фронтенд-серверу: префикс internal-локации nginx
+# для X-Accel-Redirect или True для X-Sendfile (Apache, lighttpd).
+MEDIA_ACCEL_REDIRECT = None
+MEDIA_SENDFILE = False
+
+# Сессии: база с кэшем в памяти процесса и фоновой чисткой истекших.
+# Изменения сессии из другого процесса видны не позже чем через
+# SESSION_LOCAL_CACHE_TIMEOUT секунд, удаление и смена ключа - сразу,
+# через отметку в кэше SHARED_CACHE_ALIAS.
+SESSION_ENGINE = 'core.sessions'
+SESSION_LOCAL_CACHE_SIZE = 10000
+SESSION_LOCAL_CACHE_TIMEOUT = 30
+SESSION_SWEEP_INTERVAL = 15 * 60
+
+# Снимки авторизованных пользователей в кэше SHARED_CACHE_ALIAS,
+# сбрасываются сигналами в любом процессе.
+AUTH_USER_CACHE_TIMEOUT = 5 * 60
+
+# Группы и авторы по slug и username: кэш процесса и общий кэш.
+REGISTRY_LOCAL_CACHE_SIZE = 10000
+REGISTRY_LOCAL_CACHE_TIMEOUT = 30
+REGISTRY_CACHE_TIMEOUT = 60 * 60
+
+# Кэш страниц целиком, общий для всех пользователей: пользовательские
+# части выводятся тегом hole и заполняются по состоянию пользователя.
+PAGE_CACHE_TIMEOUT = 20
+PAGE_CACHE_STATE_TIMEOUT = 5 * 60
+PAGE_CACHE_USER_STATE = ['posts.utils.follow_state']
+
+# Защита от одновременного пересчета горячих ключей кэша: истекшее
+# значение отдается еще CACHE_STALE_TIMEOUT секунд, пока один запрос
+# под блокировкой его пересчитывает; обновление начинается заранее
+# с вероятностью, растущей к сроку (XFetch).
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_TIMEOUT = 10
+CACHE_EARLY_REFRESH_BETA = 1.0
+
+# Счетчики постов в лентах лежат в кэше SHARED_CACHE_ALIAS: срок, после
+# которого счетчик пересчитывается, и срок оценки главной ленты
+# по статистике, пока точный пересчет ждет в очереди.
+FEED_COUNT_TIMEOUT = 60 * 60
+FEED_ESTIMATE_TIMEOUT = 60
+
+# Очередь писем: пачка, число попыток, задержка первого повтора
+# и срок захвата пачки отправителем.
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_POLL_INTERVAL = 5
+OUTBOX_LEASE = 5 * 60
+
+# Очередь задач: воркер run_tasks, захват задачи на TASKS_LEASE секунд,
+# задержка первого повтора упавшей задачи.
+TASKS_WORKERS = 4
+TASKS_LEASE = 5 * 60
+TASKS_RETRY_DELAY = 30
+TASKS_POLL_INTERVAL = 1
+
+# Сжатие ответов: brotli, если установлен, иначе gzip.
+COMPRESSION_MIN_LENGTH = 200
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Движок миниатюр: большие JPEG декодируются сразу в уменьшенном масштабе.
+THUMBNAIL_ENGINE = 'core.thumbnails.Engine'
+
+# default - кэш в памяти процесса для страниц и счетчиков.
+# shared - общий для всех процессов: через него процессы узнают
+# об удаленных сессиях и сброшенных снимках пользователей и видят
+# одни счетчики постов в лентах. Файловый кэш общий для процессов одного
+# сервера; на нескольких серверах нужен memcached или redis.
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            # Отметки не должны вытесняться раньше срока.
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }
+SHARED_CACHE_ALIAS = 'shared'
+
+# Очередь записи: комментарии и подписки пишутся одним потоком на базу,
+# пачками в общей транзакции. Нужна для SQLite под нагрузкой.
+WRITE_QUEUE_ENABLED = False
+WRITE_QUEUE_BATCH_SIZE = 50
+WRITE_QUEUE_TIMEOUT = 5
+
+# Просмотры постов копятся в памяти и сбрасываются в базу раз в интервал;
+# None выключает фоновый сброс.
+POST_VIEWS_FLUSH_INTERVAL = 10
+
+# Популярное: рейтинг затухает вдвое за TRENDING_HALF_LIFE секунд,
+# подписки поднимают посты автора не старше TRENDING_WINDOW секунд.
+# Посты с рейтингом ниже TRENDING_PRUNE_SCORE удаляются из таблицы.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+TRENDING_MIN_SCORE = 0.5
+TRENDING_PRUNE_SCORE = 0.01
+TRENDING_GROUPS_AMOUNT = 10
+
+FOLLOW_SUGGESTIONS_AMOUNT = 5